@@ -1,4 +1,7 @@
 #!/usr/bin/env python
+import glob
+import json
+import os
 import sys
 from coverage import coverage
 from optparse import OptionParser
@@ -19,12 +22,12 @@ if not settings.configured:
             'SYSTEMPAY_CERTIFICATE': '1122334455667788',
         })
     else:
-        for key, value in locals().items():
+        for key, value in list(locals().items()):
             if key.startswith('SYSTEMPAY'):
                 extra_settings[key] = value
 
     from oscar.defaults import *
-    for key, value in locals().items():
+    for key, value in list(locals().items()):
         if key.startswith('OSCAR'):
             extra_settings[key] = value
     extra_settings['OSCAR_ALLOW_ANON_CHECKOUT'] = True
@@ -43,9 +46,11 @@ if not settings.configured:
                 'django.contrib.contenttypes',
                 'django.contrib.sessions',
                 'django.contrib.sites',
+                'django.contrib.messages',
+                'django.contrib.staticfiles',
                 'django.contrib.flatpages',
+                'widget_tweaks',
                 'systempay',
-                'south',
                 ] + get_core_apps(),
             MIDDLEWARE_CLASSES=(
                 'django.middleware.common.CommonMiddleware',
@@ -53,17 +58,31 @@ if not settings.configured:
                 'django.middleware.csrf.CsrfViewMiddleware',
                 'django.contrib.auth.middleware.AuthenticationMiddleware',
                 'django.contrib.messages.middleware.MessageMiddleware',
-                'django.middleware.transaction.TransactionMiddleware',
                 'oscar.apps.basket.middleware.BasketMiddleware',
             ),
+            TEMPLATES=[{
+                'BACKEND': 'django.template.backends.django.DjangoTemplates',
+                'DIRS': [OSCAR_MAIN_TEMPLATE_DIR],
+                'APP_DIRS': True,
+                'OPTIONS': {
+                    'context_processors': [
+                        'django.contrib.auth.context_processors.auth',
+                        'django.template.context_processors.request',
+                        'django.contrib.messages.context_processors.messages',
+                        'oscar.apps.search.context_processors.search_form',
+                        'oscar.apps.promotions.context_processors.promotions',
+                        'oscar.apps.checkout.context_processors.checkout',
+                        'oscar.core.context_processors.metadata',
+                    ],
+                },
+            }],
             DEBUG=False,
-            SOUTH_TESTS_MIGRATE=False,
             HAYSTACK_CONNECTIONS={
                 'default': {
                     'ENGINE': 'haystack.backends.simple_backend.SimpleEngine',
                 },
             },
-            TEMPLATE_DIRS=(OSCAR_MAIN_TEMPLATE_DIR,),
+            STATIC_URL='/static/',
             SITE_ID=1,
             ROOT_URLCONF='tests.urls',
             NOSE_ARGS=['-s', '--with-spec'],
@@ -74,10 +93,6 @@ from django_nose import NoseTestSuiteRunner
 
 
 def run_tests(*test_args):
-    if 'south' in settings.INSTALLED_APPS:
-        from south.management.commands import patch_for_test_db_setup
-        patch_for_test_db_setup()
-
     if not test_args:
         test_args = ['tests']
 
@@ -91,17 +106,51 @@ def run_tests(*test_args):
 
     if num_failures > 0:
         sys.exit(num_failures)
-    print "Generating HTML coverage report"
+    print("Generating HTML coverage report")
     c.html_report()
 
 
-def generate_migration():
-    from south.management.commands.schemamigration import Command
-    com = Command()
-    com.handle(app='systempay', initial=True)
+def run_benchmarks(output=None, *test_args):
+    """
+    Run the benchmarks, every module of `tests/benchmarks` by default, and
+    write their results as JSON to ``output``.
+    """
+    if not test_args:
+        test_args = sorted(
+            'tests.benchmarks.%s' % os.path.basename(path)[:-3]
+            for path in glob.glob(os.path.join(
+                os.path.dirname(os.path.abspath(__file__)),
+                'tests', 'benchmarks', '*_benchmarks.py')))
+
+    num_failures = NoseTestSuiteRunner(verbosity=1).run_tests(test_args)
+
+    from tests.benchmarks import BENCH_ROWS, RESULTS
+    report = {'rows': BENCH_ROWS, 'python': sys.version.split()[0],
+              'results': RESULTS}
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print("Benchmark results written to %s" % output)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+    if num_failures > 0:
+        sys.exit(num_failures)
 
 
 if __name__ == '__main__':
     parser = OptionParser()
+    parser.add_option('--benchmarks', action='store_true',
+                      help="Run the benchmarks instead of the tests")
+    parser.add_option('--rows', type='int',
+                      help="Rows of the seeded tables (benchmarks)")
+    parser.add_option('--output', '-o',
+                      help="JSON file of the benchmark results")
     (options, args) = parser.parse_args()
-    run_tests(*args)
+    if options.benchmarks:
+        if options.rows:
+            # read when the benchmarks are imported
+            os.environ['SYSTEMPAY_BENCH_ROWS'] = str(options.rows)
+        run_benchmarks(options.output, *args)
+    else:
+        run_tests(*args)
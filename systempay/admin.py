@@ -9,10 +9,16 @@ class SystemPayTransactionAdmin(admin.ModelAdmin):
         'operation_type',
         'mode',
         'amount',
+        'effective_amount',
         'currency',
         'order_number',
         'result',
+        'extra_result',
         'auth_result',
+        'trans_status',
+        'capture_status',
+        'date_captured',
+        'card_brand',
         'trans_id',
         'trans_date',
         'error_message',
@@ -23,4 +29,19 @@ class SystemPayTransactionAdmin(admin.ModelAdmin):
     ]
 
 
+class SystemPayNotificationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'status', 'attempts', 'date_created',
+                    'date_processed']
+    list_filter = ['status']
+    readonly_fields = ['raw_request', 'attempts', 'error_message',
+                       'date_created', 'date_processed']
+
+
+class SystemPayReportImportAdmin(admin.ModelAdmin):
+    list_display = ['file_name', 'lines_done', 'matched', 'unmatched',
+                    'is_complete', 'date_updated']
+
+
 admin.site.register(models.SystemPayTransaction, SystemPayTransactionAdmin)
+admin.site.register(models.SystemPayNotification, SystemPayNotificationAdmin)
+admin.site.register(models.SystemPayReportImport, SystemPayReportImportAdmin)
@@ -0,0 +1,137 @@
+"""
+Allocators of the transaction ids (``vads_trans_id``).
+
+A transaction id is a number between 000000 and 899999 which must be unique
+over a day (UTC) for a given shop. The allocator used by the gateway is set
+by ``SYSTEMPAY_TRANS_ID_ALLOCATOR``, a dotted path to one of the classes
+below (``ClockTransIdAllocator`` by default).
+
+The database and cache allocators reserve blocks of ids
+(``SYSTEMPAY_TRANS_ID_BLOCK_SIZE``), so that most allocations are served
+from memory, and are unique across processes and nodes.
+"""
+import threading
+
+from django.core.cache import caches
+from django.db import connections, transaction
+
+from .exceptions import SystemPayError
+
+# Ids between 900000 and 999999 are reserved
+MAX_TRANS_ID = 900000
+
+
+class TransIdAllocator(object):
+
+    def __init__(self, block_size=100, **kwargs):
+        self.block_size = block_size
+        # (site id, day): [next id, end of the block]
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def allocate(self, site_id, now):
+        """
+        Return a transaction id for the shop ``site_id`` on the day of the
+        UTC datetime ``now``.
+        """
+        key = (site_id, now.strftime('%Y%m%d'))
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is not None and block[0] < block[1]:
+                trans_id = block[0]
+                block[0] += 1
+                return trans_id
+
+        start, end = self.reserve(*key)
+        if end - start > 1:
+            self.keep_block(key, start + 1, end)
+        return start
+
+    def keep_block(self, key, start, end):
+        """
+        Keep the rest of a reserved block for the next allocations.
+        """
+        with self._lock:
+            # blocks of the previous days are useless
+            self._blocks = dict((k, v) for k, v in self._blocks.items()
+                                if k[1] >= key[1])
+            self._blocks[key] = [start, end]
+
+    def reserve(self, site_id, day):
+        """
+        Reserve a block of ids, return a tuple ``(first id, end)``.
+        """
+        raise NotImplementedError
+
+    def check_block(self, start, end):
+        if start >= MAX_TRANS_ID:
+            raise SystemPayError("No transaction id left for today")
+        return start, min(end, MAX_TRANS_ID)
+
+
+class ClockTransIdAllocator(TransIdAllocator):
+    """
+    Derive the id from the time of the day: 10 ids per second.
+
+    Two customers confirming their order in the same tenth of a second get
+    the same id, use another allocator if it's likely to happen.
+    """
+
+    def allocate(self, site_id, now):
+        return (now.hour * 36000 + now.minute * 600 + now.second * 10 +
+                now.microsecond // 100000)
+
+
+class DatabaseTransIdAllocator(TransIdAllocator):
+    """
+    Reserve blocks of ids from a daily sequence stored in the database.
+
+    Reservations are committed on their own, a reservation rolled back with
+    an enclosing transaction would give the same ids again. They are refused
+    within a transaction of the ``SYSTEMPAY_TRANS_ID_DATABASE`` alias: when
+    requests run in a database transaction (``ATOMIC_REQUESTS``), set it to
+    another alias of the same database, which stays in autocommit mode.
+    """
+
+    def __init__(self, using='default', **kwargs):
+        super(DatabaseTransIdAllocator, self).__init__(**kwargs)
+        self.using = using
+
+    def reserve(self, site_id, day):
+        from .models import SystemPayTransIdSequence
+
+        if connections[self.using].in_atomic_block:
+            raise RuntimeError(
+                "Transaction ids can't be reserved within a transaction of "
+                "the database '%s', set SYSTEMPAY_TRANS_ID_DATABASE to "
+                "another alias" % self.using)
+
+        with transaction.atomic(using=self.using):
+            sequence, created = SystemPayTransIdSequence.objects \
+                .using(self.using).select_for_update() \
+                .get_or_create(site_id=site_id, day=day)
+            start, end = self.check_block(
+                sequence.next_value, sequence.next_value + self.block_size)
+            sequence.next_value = end
+            sequence.save(update_fields=['next_value'])
+        return start, end
+
+
+class CacheTransIdAllocator(TransIdAllocator):
+    """
+    Reserve blocks of ids from an atomic counter of a cache shared by every
+    node, eg. memcached or redis (``SYSTEMPAY_TRANS_ID_CACHE``).
+    """
+
+    # Counters outlive their day, in case of clock drift between nodes
+    TIMEOUT = 2 * 24 * 3600
+
+    def __init__(self, cache='default', **kwargs):
+        super(CacheTransIdAllocator, self).__init__(**kwargs)
+        self.cache = caches[cache]
+
+    def reserve(self, site_id, day):
+        key = 'systempay-trans-id-%s-%s' % (site_id, day)
+        self.cache.add(key, 0, self.TIMEOUT)
+        end = self.cache.incr(key, self.block_size)
+        return self.check_block(end - self.block_size, end)
@@ -10,11 +10,14 @@ class SystemPayDashboardApplication(Application):
     name = None
     list_view = views.TransactionListView
     detail_view = views.TransactionDetailView
+    export_view = views.TransactionExportView
 
     def get_urls(self):
         urlpatterns = (
             url(r'^transactions/$', self.list_view.as_view(),
                 name='systempay-list'),
+            url(r'^transactions/export/$', self.export_view.as_view(),
+                name='systempay-export'),
             url(r'^transactions/(?P<pk>\d+)/$', self.detail_view.as_view(),
                 name='systempay-detail'),
         )
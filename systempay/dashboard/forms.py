@@ -0,0 +1,71 @@
+import datetime
+
+from django import forms
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+from systempay.exceptions import VADS_RESULT
+from systempay.forms import SystemPayNotificationForm
+from systempay.models import SystemPayTransaction
+
+EMPTY_CHOICE = ('', '---------')
+
+
+class TransactionSearchForm(forms.Form):
+    """
+    Dashboard search of transactions. Each filter is backed by an index of
+    the transaction table.
+    """
+
+    order_number = forms.CharField(
+        required=False, label=_("Order number"),
+        help_text=_("Matches the beginning of the order number"))
+    trans_id = forms.CharField(required=False, max_length=6,
+                               label=_("Trans ID"))
+    date_from = forms.DateField(required=False, label=_("Date from"))
+    date_to = forms.DateField(required=False, label=_("Date to"))
+    result = forms.ChoiceField(
+        required=False, label=_("Result"),
+        choices=[EMPTY_CHOICE] + [(code, '%s - %s' % (code, message))
+                                  for code, message in
+                                  sorted(VADS_RESULT.items())])
+    operation_type = forms.ChoiceField(
+        required=False, label=_("Op. Type"),
+        choices=[EMPTY_CHOICE] + [
+            choice for choice in SystemPayTransaction.OPERATION_TYPE_CHOICES
+            if choice[0]])
+    trans_status = forms.ChoiceField(
+        required=False, label=_("Status"),
+        choices=(EMPTY_CHOICE,) +
+        SystemPayNotificationForm.TRANS_STATUS_CHOICES)
+
+    def _datetime(self, date):
+        dt = datetime.datetime.combine(date, datetime.time.min)
+        if settings.USE_TZ:
+            dt = timezone.make_aware(dt, timezone.get_current_timezone())
+        return dt
+
+    def filter(self, queryset):
+        """
+        Apply the filters of a valid form to ``queryset``.
+        """
+        data = self.cleaned_data
+        if data['order_number']:
+            # a range rather than a LIKE, which SQLite can't match with the
+            # index on order_number
+            prefix = data['order_number']
+            queryset = queryset.filter(
+                order_number__range=(prefix, prefix + '\uffff'))
+        if data['trans_id']:
+            queryset = queryset.filter(trans_id=data['trans_id'])
+        if data['date_from']:
+            queryset = queryset.filter(
+                date_created__gte=self._datetime(data['date_from']))
+        if data['date_to']:
+            queryset = queryset.filter(date_created__lt=self._datetime(
+                data['date_to'] + datetime.timedelta(days=1)))
+        for name in ('result', 'operation_type', 'trans_status'):
+            if data[name]:
+                queryset = queryset.filter(**{name: data[name]})
+        return queryset
@@ -1,13 +1,156 @@
 from django.views import generic
 from django.conf import settings
+from django.contrib import messages
+from django.core.urlresolvers import reverse
+from django.db.models import Q
+from django.http import Http404, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import ugettext_lazy as _
 
-from systempay import models
+from systempay import export, models
+from systempay.dashboard.forms import TransactionSearchForm
+
+
+class KeysetPage(object):
+    """
+    A page of transactions paginated on ``(date_created, id)``, newest first.
+
+    Neighbour pages are designated by a cursor on the first or last row of
+    the page rather than by a page number, so that fetching a deep page
+    costs the same as fetching the first one.
+    """
+
+    def __init__(self, object_list, has_previous, has_next):
+        self.object_list = object_list
+        self._has_previous = has_previous
+        self._has_next = has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self._has_previous or self._has_next
+
+    @staticmethod
+    def encode_cursor(txn):
+        return '%s,%d' % (txn.date_created.isoformat(), txn.id)
+
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            date_created, pk = cursor.rsplit(',', 1)
+            date_created = parse_datetime(date_created)
+            pk = int(pk)
+        except ValueError:
+            date_created = None
+        if date_created is None:
+            raise Http404(_("Invalid page"))
+        return date_created, pk
+
+    def previous_cursor(self):
+        return self.encode_cursor(self.object_list[0])
+
+    def next_cursor(self):
+        return self.encode_cursor(self.object_list[-1])
 
 
 class TransactionListView(generic.ListView):
     model = models.SystemPayTransaction
     template_name = 'systempay/dashboard/transaction_list.html'
     context_object_name = 'transactions'
+    form_class = TransactionSearchForm
+    paginate_by = 50
+
+    # Columns displayed by the template
+    list_fields = ('id', 'trans_id', 'mode', 'order_number', 'operation_type',
+                   'amount', 'currency', 'date_created', 'trans_status',
+                   'result')
+
+    # Query parameters of the keyset pagination
+    page_params = ('after', 'before')
+
+    def get_queryset(self):
+        qs = super(TransactionListView, self).get_queryset()
+        qs = qs.only(*self.list_fields).order_by('-date_created', '-id')
+
+        self.form = self.form_class(self.request.GET or None)
+        if self.form.is_valid():
+            qs = self.form.filter(qs)
+        return qs
+
+    def get_context_data(self, **kwargs):
+        ctx = super(TransactionListView, self).get_context_data(**kwargs)
+        ctx['form'] = self.form
+        search_params = self.request.GET.copy()
+        for param in self.page_params:
+            search_params.pop(param, None)
+        ctx['search_params'] = search_params.urlencode()
+        return ctx
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Keyset pagination: the page after the ``after`` cursor, or the page
+        before the ``before`` cursor, or the first page.
+        """
+        after = self.request.GET.get('after')
+        before = self.request.GET.get('before')
+
+        if before:
+            date_created, pk = KeysetPage.decode_cursor(before)
+            rows = list(queryset.filter(date_created__gte=date_created)
+                        .filter(Q(date_created__gt=date_created) |
+                                Q(id__gt=pk))
+                        .reverse()[:page_size + 1])
+            has_previous = len(rows) > page_size
+            rows = rows[:page_size][::-1]
+            has_next = True
+        else:
+            if after:
+                date_created, pk = KeysetPage.decode_cursor(after)
+                queryset = queryset.filter(
+                    date_created__lte=date_created
+                ).filter(Q(date_created__lt=date_created) | Q(id__lt=pk))
+            rows = list(queryset[:page_size + 1])
+            has_next = len(rows) > page_size
+            rows = rows[:page_size]
+            has_previous = bool(after)
+
+        page = KeysetPage(rows, has_previous, has_next)
+        return None, page, rows, page.has_other_pages()
+
+
+class TransactionExportView(generic.View):
+    """
+    Stream the transactions matching the dashboard search as CSV or NDJSON.
+    """
+    form_class = TransactionSearchForm
+
+    def get(self, request, *args, **kwargs):
+        format = request.GET.get('format', 'csv')
+        if format not in export.FORMATS:
+            raise Http404(_("Unknown export format"))
+
+        form = self.form_class(request.GET)
+        if not form.is_valid():
+            # back to the search, which shows the errors, rather than an
+            # export of the whole table
+            messages.error(request, _("The search is not valid, nothing "
+                                      "was exported"))
+            params = request.GET.copy()
+            params.pop('format', None)
+            return HttpResponseRedirect('%s?%s' % (
+                reverse('systempay-list'), params.urlencode()))
+        qs = form.filter(models.SystemPayTransaction.objects.all())
+
+        content_type, extension = export.FORMATS[format][1:]
+        response = StreamingHttpResponse(export.export_lines(qs, format),
+                                         content_type=content_type)
+        response['Content-Disposition'] = \
+            'attachment; filename="systempay-transactions.%s"' % extension
+        return response
 
 
 class TransactionDetailView(generic.DetailView):
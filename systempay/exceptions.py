@@ -25,3 +25,11 @@ class SystemPayResultError(SystemPayError):
             self.code,
             VADS_RESULT.get(code, '<unknown>'))
         Exception.__init__(self, message)
+
+
+class SystemPayDuplicateNotification(SystemPayError):
+
+    def __init__(self, key):
+        self.key = key
+        Exception.__init__(
+            self, "Notification '%s' has already been received" % key)
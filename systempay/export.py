@@ -0,0 +1,72 @@
+"""
+Streaming export of transactions, for accounting.
+
+Rows are read through a database cursor, chunk by chunk, and serialized
+line by line so that exports of any size run in constant memory.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+EXPORT_FIELDS = (
+    'id', 'date_created', 'mode', 'operation_type', 'order_number',
+    'trans_id', 'trans_date', 'amount', 'effective_amount', 'currency',
+    'result', 'extra_result', 'auth_result', 'trans_status', 'card_brand',
+    'error_message',
+)
+
+# Rows fetched from the database at once
+CHUNK_SIZE = 2000
+
+
+def iterate(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Iterate over ``queryset`` without caching it, using a server-side
+    cursor where the database supports it.
+    """
+    try:
+        return queryset.iterator(chunk_size=chunk_size)
+    except TypeError:
+        # Django < 2.0 has no chunk_size and uses its own (100 rows)
+        return queryset.iterator()
+
+
+class Echo(object):
+    """
+    File-like object returning what is written, to use ``csv.writer`` as a
+    line serializer.
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(queryset, fields=EXPORT_FIELDS, chunk_size=CHUNK_SIZE):
+    writer = csv.writer(Echo())
+    yield writer.writerow(fields)
+    for row in iterate(queryset.values_list(*fields), chunk_size):
+        yield writer.writerow(row)
+
+
+def ndjson_lines(queryset, fields=EXPORT_FIELDS, chunk_size=CHUNK_SIZE):
+    encoder = DjangoJSONEncoder()
+    for row in iterate(queryset.values_list(*fields), chunk_size):
+        yield encoder.encode(dict(zip(fields, row))) + '\n'
+
+
+# format: (line generator, content type, file extension)
+FORMATS = {
+    'csv': (csv_lines, 'text/csv', 'csv'),
+    'ndjson': (ndjson_lines, 'application/x-ndjson', 'ndjson'),
+}
+
+
+def export_lines(queryset, format='csv', chunk_size=CHUNK_SIZE):
+    """
+    Return a generator of the lines of ``queryset`` serialized in ``format``.
+    Rows are exported in chronological order.
+    """
+    if format not in FORMATS:
+        raise ValueError("Unknown export format '%s'" % format)
+    queryset = queryset.order_by('date_created', 'id')
+    return FORMATS[format][0](queryset, chunk_size=chunk_size)
@@ -1,33 +1,164 @@
-from urllib.parse import urlencode
 import logging
 
 from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import IntegrityError, transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
 from django.http import QueryDict
 from django.utils.translation import ugettext_lazy as _
 
+from . import metrics
 from .gateway import Gateway
-from .models import SystemPayTransaction
-from systempay.forms import SystemPayNotificationForm
-from .utils import printable_form_errors, get_amount_from_systempay
-from .exceptions import SystemPayFormNotValid, SystemPayResultError
+from .models import SystemPayTransaction, get_currency
+from .submitlog import log_submit_txn
+from .utils import encode_raw_request, get_amount_from_systempay
+from .exceptions import (SystemPayDuplicateNotification,
+                         SystemPayFormNotValid, SystemPayResultError)
 
 
 logger = logging.getLogger('systempay')
 
 
+def get_trans_id_allocator():
+    """
+    Build the transaction id allocator set in the settings.
+    """
+    allocator_class = import_string(getattr(
+        settings, 'SYSTEMPAY_TRANS_ID_ALLOCATOR',
+        'systempay.allocators.ClockTransIdAllocator'))
+    return allocator_class(
+        block_size=getattr(settings, 'SYSTEMPAY_TRANS_ID_BLOCK_SIZE', 100),
+        using=getattr(settings, 'SYSTEMPAY_TRANS_ID_DATABASE', 'default'),
+        cache=getattr(settings, 'SYSTEMPAY_TRANS_ID_CACHE', 'default'),
+    )
+
+
+def merchant_setting(config, name, default=None):
+    """
+    Setting ``name`` of a merchant: from its configuration in
+    `SYSTEMPAY_MERCHANTS`, or else the global `SYSTEMPAY_<name>` setting.
+    """
+    if name in config:
+        return config[name]
+    return getattr(settings, 'SYSTEMPAY_%s' % name, default)
+
+
+def build_gateway(config=None, site=None, trans_id_allocator=None):
+    """
+    Build the gateway of a merchant from its configuration, see
+    `merchant_setting`.
+    """
+    config = config or {}
+    return Gateway(
+        merchant_setting(config, 'SANDBOX_MODE'),
+        merchant_setting(config, 'SITE_ID'),
+        merchant_setting(config, 'CERTIFICATE'),
+        merchant_setting(config, 'ACTION_MODE', 'INTERACTIVE'),
+        signature_algorithm=merchant_setting(
+            config, 'SIGNATURE_ALGORITHM', 'SHA1'),
+        trans_id_allocator=trans_id_allocator or get_trans_id_allocator(),
+        site=site,
+    )
+
+
+class FacadeRegistry(object):
+    """
+    Facades of the merchants served by the process, indexed by Django site
+    and by SystemPay shop id (`vads_site_id`).
+
+    The default merchant is configured by the global `SYSTEMPAY_*` settings,
+    and other merchants by `SYSTEMPAY_MERCHANTS`, a dict of configurations
+    by Django site id, eg.::
+
+        SYSTEMPAY_MERCHANTS = {
+            2: {'SITE_ID': '87654321', 'CERTIFICATE': '8877665544332211'},
+        }
+    """
+
+    def __init__(self):
+        # shared by the merchants, their ids are allocated per shop
+        allocator = get_trans_id_allocator()
+        self.default = Facade(build_gateway(trans_id_allocator=allocator))
+        self._by_site = {}
+        self._by_shop = {str(self.default.gateway.site_id): self.default}
+
+        merchants = getattr(settings, 'SYSTEMPAY_MERCHANTS', {})
+        for site_id, config in merchants.items():
+            facade = Facade(build_gateway(config, site_id, allocator),
+                            merchant_setting(config, 'CURRENCY'))
+            self._by_site[site_id] = facade
+            self._by_shop[str(facade.gateway.site_id)] = facade
+
+    def for_site(self, site=None):
+        if site is None:
+            return self.default
+        return self._by_site.get(site.pk, self.default)
+
+    def for_shop(self, shop_id):
+        return self._by_shop.get(shop_id, self.default)
+
+    def for_notification(self, data):
+        return self.for_shop(data.get('vads_site_id'))
+
+    def signature_settings(self):
+        """
+        Signature settings of the merchants, by shop id (`None` for the
+        default merchant), see `Gateway.signature_settings`.
+        """
+        settings_by_shop = dict(
+            (shop_id, facade.gateway.signature_settings())
+            for shop_id, facade in self._by_shop.items())
+        settings_by_shop[None] = self.default.gateway.signature_settings()
+        return settings_by_shop
+
+
+# Facades of the process, see `get_registry`
+_registry = None
+
+
+def get_registry():
+    """
+    Return the registry shared by the whole process, built from the settings
+    on first use.
+    """
+    global _registry
+    if _registry is None:
+        _registry = FacadeRegistry()
+    return _registry
+
+
+def get_facade(site=None):
+    """
+    Return the facade of the merchant of ``site``, the default merchant if
+    it is not given.
+    """
+    return get_registry().for_site(site)
+
+
+def get_facade_for_notification(data):
+    """
+    Return the facade of the merchant a notification is sent to.
+    """
+    return get_registry().for_notification(data)
+
+
+@receiver(setting_changed)
+def reset_registry(setting, **kwargs):
+    global _registry
+    if setting.startswith('SYSTEMPAY_'):
+        _registry = None
+
+
 class Facade(object):
     """
     A bridge between oscar's objects and the core gateway object.
     """
 
-    def __init__(self):
-        self.gateway = Gateway(
-            settings.SYSTEMPAY_SANDBOX_MODE,
-            settings.SYSTEMPAY_SITE_ID,
-            settings.SYSTEMPAY_CERTIFICATE,
-            getattr(settings, 'SYSTEMPAY_ACTION_MODE', 'INTERACTIVE'),
-        )
-        self.currency = getattr(settings, 'SYSTEMPAY_CURRENCY', 978)  # 978
+    def __init__(self, gateway=None, currency=None):
+        self.gateway = gateway or build_gateway()
+        self.currency = currency or getattr(settings, 'SYSTEMPAY_CURRENCY',
+                                            978)  # 978
         # stands for EURO (ISO 639-1)
 
     def get_result(self, form):
@@ -50,6 +181,8 @@ class Facade(object):
         params = dict()
 
         params['vads_order_id'] = order.number
+        # numeric ISO 4217 code of the merchant's currency
+        params['vads_currency'] = str(self.currency)
 
         if order.user:
             params['vads_cust_name'] = order.user.get_full_name()
@@ -77,11 +210,12 @@ class Facade(object):
 
         params.update(kwargs)
 
-        form = self.gateway.get_submit_form(
-            order.total_incl_tax,
-            **params
-        )
-        self.gateway.sign(form)
+        with metrics.timer('systempay.submit.form'):
+            form = self.gateway.get_submit_form(
+                order.total_incl_tax,
+                **params
+            )
+            self.gateway.sign(form)
         return form
 
     def set_txn(self, request):
@@ -91,31 +225,66 @@ class Facade(object):
         :param request: request from Ipn View
         :return: SystemPayTransaction object
         """
+        return self.set_txn_from_data(request.POST)
+
+    def set_txn_from_data(self, data, identify=True):
+        """
+        Set a transaction from the data of an Instant Payment Notification.
+
+        :param data: QueryDict of the notification
+        :param identify: set the notification key of a valid transaction,
+            replays of the notification are then rejected. The IPN view
+            sets it itself, in the database transaction of the payment.
+        :return: SystemPayTransaction object
+        """
+
+        # SystemPay resends the notifications which were not acknowledged
+        key = SystemPayTransaction.get_notification_key(data)
+        if key and SystemPayTransaction.objects.filter(
+                notification_key=key).exists():
+            raise SystemPayDuplicateNotification(key)
 
-        form = SystemPayNotificationForm(request.POST)
+        # the signature is checked first, on the raw data
+        parser = self.gateway.notification_parser
+        with metrics.timer('systempay.ipn.verify'):
+            signed, expected, received = parser.check_signature(data)
+        complete = True
+        if not signed:
+            error_message = \
+                _("Signature not valid. Get '%s' instead of '%s'") % (
+                    received, expected)
+        else:
+            error_message = parser.clean(data)[1]
+            complete = not error_message
 
-        # create transaction
-        order_number = request.POST.get('vads_order_id')
-        amount = get_amount_from_systempay(request.POST.get('vads_amount', '0'))
-        txn = self.save_txn_notification(order_number, amount, request)
+        # create transaction, only valid notifications are identified
+        order_number = data.get('vads_order_id')
+        amount = get_amount_from_systempay(data.get('vads_amount', '0'))
+        try:
+            with metrics.timer('systempay.ipn.db_write'), \
+                    transaction.atomic():
+                txn = self.save_txn(
+                    order_number, amount, data,
+                    SystemPayTransaction.MODE_RESPONSE,
+                    error_message=error_message,
+                    notification_key=key if identify and not error_message
+                    else None)
+        except IntegrityError:
+            # the same notification has been received concurrently
+            raise SystemPayDuplicateNotification(key)
 
-        if not form.is_valid():
-            txn.error_message = printable_form_errors(form)
-            txn.save()
+        metrics.increment('systempay.ipn.result', result=txn.result,
+                          trans_status=txn.trans_status)
+
+        if not complete:
             msg = _("The data received are not complete: %s. See the "
                     "transaction record #%s for more details") % (
-                printable_form_errors(form),
+                error_message,
                 txn.id,
             )
             raise SystemPayFormNotValid(msg)
 
-        if not self.gateway.is_signature_valid(form):
-            txn.error_message = \
-                _("Signature not valid. Get '%s' instead of '%s'") % (
-                    form.cleaned_data['signature'],
-                    self.gateway.compute_signature(form)
-                )
-            txn.save()
+        if error_message:
             raise SystemPayFormNotValid(
                 _("Incorrect signature. Check SystemPayTransaction #%s "
                   "for more details") % txn.id)
@@ -127,24 +296,42 @@ class Facade(object):
 
         return txn
 
+    def is_signature_valid(self, data):
+        """
+        Check the signature of the data of a notification.
+        """
+        with metrics.timer('systempay.ipn.verify'):
+            return self.gateway.notification_parser.check_signature(data)[0]
+
     def save_submit_txn(self, order_number, amount, form):
         """
-        Save submitted transaction into the database.
+        Save submitted transaction into the database, or buffer it when
+        ``SYSTEMPAY_SUBMIT_LOG`` is ``'buffered'``.
         """
-        return self.save_txn(order_number, amount, form.data,
-                             SystemPayTransaction.MODE_SUBMIT)
+        with metrics.timer('systempay.submit.db_write'):
+            return log_submit_txn(self.build_txn(
+                order_number, amount, form.data,
+                SystemPayTransaction.MODE_SUBMIT))
 
-    def save_txn_notification(self, order_number, amount, request):
+    def save_txn_notification(self, order_number, amount, request, **kwargs):
         """
         Save notification transaction into the database.
         """
         return self.save_txn(order_number, amount, request.POST.copy(),
-                             SystemPayTransaction.MODE_RESPONSE)
+                             SystemPayTransaction.MODE_RESPONSE, **kwargs)
 
-    def save_txn(self, order_number, amount, data, mode):
+    def save_txn(self, order_number, amount, data, mode, **kwargs):
         """
         Save the transaction into the database, submitted or received.
         """
+        txn = self.build_txn(order_number, amount, data, mode, **kwargs)
+        txn.save(force_insert=True)
+        return txn
+
+    def build_txn(self, order_number, amount, data, mode, **kwargs):
+        """
+        Build the transaction, submitted or received, without saving it.
+        """
         # convert the QueryDict into a dict in case of POST data
         d = {}
         if isinstance(data, QueryDict):
@@ -153,14 +340,24 @@ class Facade(object):
         else:
             d.update(data)
 
-        return SystemPayTransaction.objects.create(
+        effective_amount = d.get('vads_effective_amount')
+        if effective_amount:
+            effective_amount = get_amount_from_systempay(effective_amount)
+
+        return SystemPayTransaction(
             mode=mode,
             operation_type=d.get('vads_operation_type'),
             trans_id=d.get('vads_trans_id'),
             trans_date=d.get('vads_trans_date'),
             order_number=order_number,
             amount=amount,
+            effective_amount=effective_amount or None,
+            currency=get_currency(d.get('vads_currency')),
             auth_result=d.get('vads_auth_result'),
             result=d.get('vads_result'),
-            raw_request=urlencode(d)
+            extra_result=d.get('vads_extra_result'),
+            trans_status=d.get('vads_trans_status'),
+            card_brand=d.get('vads_card_brand'),
+            raw_request=encode_raw_request(d),
+            **kwargs
         )
@@ -1,7 +1,20 @@
+from functools import lru_cache
+
 from django import forms
 from django.utils.encoding import force_text
 
 
+@lru_cache(maxsize=64)
+def sorted_vads_params(params):
+    """
+    Sorted tuple of the `vads_*` parameters of the frozenset ``params``.
+
+    Notifications of a shop carry a handful of distinct sets of parameters,
+    so their order is only computed once per set.
+    """
+    return tuple(sorted(p for p in params if p.startswith('vads_')))
+
+
 class AbstractSystemPayForm(forms.Form):
     """
     Common part (abstract) on which are built SystemPaySubmitForm and
@@ -34,7 +47,8 @@ class AbstractSystemPayForm(forms.Form):
     # NB: it should only be unique over the current day
     vads_trans_id = forms.CharField(min_length=6, max_length=6)
     vads_version = forms.CharField(max_length=8)
-    signature = forms.CharField(min_length=40, max_length=40)
+    # 40 characters in SHA1, 44 in HMAC-SHA-256
+    signature = forms.CharField(min_length=40, max_length=44)
 
     #################
     # Optional params
@@ -67,8 +81,7 @@ class AbstractSystemPayForm(forms.Form):
         raise NotImplementedError
 
     def sorted_signature_params(self, data):
-        return sorted(p for p in self.signature_params(data)
-                      if p.startswith('vads_'))
+        return sorted_vads_params(frozenset(self.signature_params(data)))
 
     def values_for_signature(self, data):
         return tuple([force_text(data.get(param, ''), encoding='utf8')
@@ -144,6 +157,19 @@ class SystemPaySubmitForm(AbstractSystemPayForm):
     def signature_params(self, data):
         return self.fields.keys()
 
+    @classmethod
+    def signature_fields(cls):
+        """
+        Sorted `vads_*` fields of the class, computed once per class.
+        """
+        if '_signature_fields' not in cls.__dict__:
+            cls._signature_fields = tuple(sorted(
+                f for f in cls.base_fields if f.startswith('vads_')))
+        return cls._signature_fields
+
+    def sorted_signature_params(self, data):
+        return self.signature_fields()
+
 
 class SystemPayNotificationForm(AbstractSystemPayForm):
     """
@@ -1,27 +1,80 @@
 import re
 import datetime
 import logging
-from hashlib import sha1
 
 from django.utils.translation import ugettext_lazy as _
 from django.conf import settings
+from django.core.signals import setting_changed
 from django.core.urlresolvers import reverse
 from django.contrib.sites.models import Site
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
+from . import metrics
+from .allocators import ClockTransIdAllocator
 from .forms import SystemPaySubmitForm
+from .parser import NotificationParser
+from .signature import get_signature_algorithm
 from .utils import set_amount_for_systempay
 
 logger = logging.getLogger('systempay')
 
 
-def build_absolute_uri(location):
+def build_absolute_uri(location, site=None):
     """
     Require use of SSL on production mode.
     """
     scheme = "https"
     if settings.DEBUG:
         scheme = "http"
-    return '%s://%s%s' % (scheme, Site.objects.get_current().domain, location)
+    site = site or Site.objects.get_current()
+    return '%s://%s%s' % (scheme, site.domain, location)
+
+
+# (return url, cancel url) by site id, see `get_return_urls`
+_return_urls = {}
+
+
+def get_return_urls(site_id=None):
+    """
+    Return the absolute urls of the return and cancel views, on the site
+    ``site_id`` (the current site by default), as a tuple.
+
+    They are built once per site, unless set by the `SYSTEMPAY_RETURN_URL`
+    and `SYSTEMPAY_CANCEL_URL` settings.
+    """
+    return_url = getattr(settings, 'SYSTEMPAY_RETURN_URL', None)
+    cancel_url = getattr(settings, 'SYSTEMPAY_CANCEL_URL', None)
+    if return_url and cancel_url:
+        return return_url, cancel_url
+
+    key = site_id or getattr(settings, 'SITE_ID', None)
+    urls = _return_urls.get(key)
+    if urls is None:
+        if site_id:
+            site = Site.objects.get(pk=site_id)
+        else:
+            site = Site.objects.get_current()
+        urls = _return_urls[key] = (
+            return_url or build_absolute_uri(
+                reverse('systempay:return-response'), site),
+            cancel_url or build_absolute_uri(
+                reverse('systempay:cancel-response'), site),
+        )
+    return urls
+
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def clear_return_urls_on_site_change(**kwargs):
+    _return_urls.clear()
+
+
+@receiver(setting_changed)
+def clear_return_urls_on_setting_change(setting, **kwargs):
+    if setting in ('DEBUG', 'SITE_ID', 'ROOT_URLCONF') or \
+            setting.startswith('SYSTEMPAY_'):
+        _return_urls.clear()
 
 
 class Gateway(object):
@@ -34,7 +87,9 @@ class Gateway(object):
 
     def __init__(self, sandbox_mode, site_id, certificate, action_mode,
                  version='V2', notify_user_by_email=False,
-                 post_on_customer_return=False, custom_contracts=None):
+                 post_on_customer_return=False, custom_contracts=None,
+                 signature_algorithm='SHA1', trans_id_allocator=None,
+                 site=None):
 
         if not sandbox_mode:
             context_mode = 'PRODUCTION'
@@ -53,46 +108,64 @@ class Gateway(object):
         self._action_mode = action_mode
 
         self._certificate = certificate
+        self._signature = get_signature_algorithm(signature_algorithm,
+                                                  certificate)
+        self.notification_parser = NotificationParser(self._signature)
         self._version = version
+        self._trans_id_allocator = trans_id_allocator or \
+            ClockTransIdAllocator()
+
+        # id of the Django site of the return urls (current site by default)
+        self._site = site
 
         # optional params (impact the required params)
         self._notify_user_by_email = notify_user_by_email
         self._post_on_customer_return = post_on_customer_return
         self._custom_contracts = custom_contracts
 
+    @property
+    def site_id(self):
+        return self._site_id
+
+    @property
+    def signature_algorithm(self):
+        return self._signature
+
+    def signature_settings(self):
+        """
+        Picklable settings of the signature: (algorithm name, certificate).
+        """
+        return self._signature.name, self._certificate
+
     def compute_signature(self, form):
         """
         Compute the signature according to the doc.
         """
-        params = form.values_for_signature(form.data)
-        sign = '+'.join(params) + '+' + self._certificate
-        return sha1(sign.encode(encoding='utf8')).hexdigest()
+        with metrics.timer('systempay.submit.sign'):
+            return self._signature.sign(
+                form.values_for_signature(form.data))
 
     def is_signature_valid(self, form):
         if form.is_valid():
-            signature = self.compute_signature(form)
-            return signature == form.cleaned_data['signature']
+            return self._signature.verify(
+                form.values_for_signature(form.data),
+                form.cleaned_data['signature'])
 
     def sign(self, form):
         form.data['signature'] = self.compute_signature(form)
 
-    def get_trans_date(self):
-        return datetime.datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    def get_trans_date(self, now=None):
+        now = now or datetime.datetime.utcnow()
+        return now.strftime('%Y%m%d%H%M%S')
 
-    def get_trans_id(self):
+    def get_trans_id(self, now=None):
         """
-        Range allowed is between 000000 and 899999.
-        So if we assume that there is only one transaction per sec, that
-        covers 86400 unique transactions. And to decrease the probability
-        of a collision between two customers in the very same second we
-        can use the first digit of the microsecond.
-
-        It's not completely bulletproof, two persons might confirm their order
-        in the same time, same second and the same microsecond.
+        Range allowed is between 000000 and 899999, and an id must be unique
+        over the day of ``now`` (UTC). The id is given by the allocator of
+        the gateway, see `systempay.allocators`.
         """
-        n = datetime.datetime.utcnow()
-        return "%06d" % (n.hour*36000 + n.minute*600 + n.second*10 +
-                         n.microsecond/10000)
+        now = now or datetime.datetime.utcnow()
+        return "%06d" % self._trans_id_allocator.allocate(self._site_id, now)
 
     def get_submit_form(self, amount, **kwargs):
         """
@@ -116,8 +189,10 @@ class Gateway(object):
         data['vads_payment_config'] = kwargs.get('vads_payment_config',
                                                  'SINGLE')
         data['vads_site_id'] = self._site_id
-        data['vads_trans_date'] = self.get_trans_date()
-        data['vads_trans_id'] = self.get_trans_id()
+        # the id is unique over the day of the transaction date
+        now = datetime.datetime.utcnow()
+        data['vads_trans_date'] = self.get_trans_date(now)
+        data['vads_trans_id'] = self.get_trans_id(now)
         data['vads_validation_mode'] = kwargs.get('vads_validation_mode', '')
         data['vads_version'] = self._version
 
@@ -132,18 +207,11 @@ class Gateway(object):
 
         # Return urls (optional): if used, they have precedence on back-office
         # settings
-        data['vads_url_success'] = build_absolute_uri(
-            reverse('systempay:return-response')
-        )
-        data['vads_url_return'] = build_absolute_uri(
-            reverse('systempay:return-response')
-        )
-        data['vads_url_cancel'] = build_absolute_uri(
-            reverse('systempay:cancel-response')
-        )
-        data['vads_url_refused'] = build_absolute_uri(
-            reverse('systempay:cancel-response')
-        )
+        return_url, cancel_url = get_return_urls(self._site)
+        data['vads_url_success'] = return_url
+        data['vads_url_return'] = return_url
+        data['vads_url_cancel'] = cancel_url
+        data['vads_url_refused'] = cancel_url
 
         # Automatic return
         data['vads_redirect_success_timeout'] = 5
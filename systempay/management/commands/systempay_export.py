@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from systempay import export
+from systempay.models import SystemPayTransaction
+from systempay.utils import parse_day
+
+
+class Command(BaseCommand):
+    help = "Export SystemPay transactions as CSV or NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(export.FORMATS),
+                            default='csv')
+        parser.add_argument('--output', '-o',
+                            help="Output file (default: standard output)")
+        parser.add_argument('--since', type=parse_day,
+                            help="First day exported (YYYY-MM-DD)")
+        parser.add_argument('--until', type=parse_day,
+                            help="Day after the last day exported "
+                                 "(YYYY-MM-DD)")
+        parser.add_argument('--mode',
+                            choices=[m for m, _ in
+                                     SystemPayTransaction.MODE_CHOICES])
+        parser.add_argument('--chunk-size', type=int,
+                            default=export.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        qs = SystemPayTransaction.objects.all()
+        if options['since']:
+            qs = qs.filter(date_created__gte=options['since'])
+        if options['until']:
+            qs = qs.filter(date_created__lt=options['until'])
+        if options['mode']:
+            qs = qs.filter(mode=options['mode'])
+
+        lines = export.export_lines(qs, options['format'],
+                                    options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from systempay import reports
+
+
+def parse_column(value):
+    name, sep, header = value.partition('=')
+    if not sep or name not in reports.COLUMNS:
+        raise ValueError(value)
+    return name, header
+
+
+class Command(BaseCommand):
+    help = "Import the capture status of SystemPay transactions from " \
+           "back-office report files (CSV, optionally gzipped)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', metavar='path')
+        parser.add_argument('--column', type=parse_column, action='append',
+                            default=[],
+                            help="Header of a column, e.g. "
+                                 "trans_id=TRANSACTION_ID (columns: %s)"
+                                 % ', '.join(sorted(reports.COLUMNS)))
+        parser.add_argument('--date-format', default=reports.DATE_FORMAT,
+                            help="Format of the dates, in UTC")
+        parser.add_argument('--delimiter', default=';')
+        parser.add_argument('--batch-size', type=int,
+                            default=reports.BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        importer = reports.ReportImporter(
+            columns=dict(options['column']),
+            date_format=options['date_format'],
+            delimiter=options['delimiter'],
+            batch_size=options['batch_size'])
+        for path in options['paths']:
+            try:
+                progress = importer.import_file(path)
+            except (KeyError, ValueError) as e:
+                raise CommandError("%s: invalid report (%s)" % (path, e))
+            self.stdout.write("%s: %d line(s), %d matched, %d unmatched" % (
+                path, progress.lines_done, progress.matched,
+                progress.unmatched))
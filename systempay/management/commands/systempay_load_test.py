@@ -0,0 +1,190 @@
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal as D
+from html.parser import HTMLParser
+from importlib import import_module
+
+import requests
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from systempay.models import SystemPayTransaction
+
+
+def percentile(values, share):
+    if not values:
+        return None
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+def prefix_range(prefix):
+    return prefix, prefix + '\uffff'
+
+
+class SubmitFormParser(HTMLParser):
+    """
+    Read the payment form of the redirection page, as posted by the
+    browser.
+    """
+
+    def __init__(self):
+        super(SubmitFormParser, self).__init__(convert_charrefs=True)
+        self.action = None
+        self.data = {}
+        self._in_form = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'form' and attrs.get('id') == 'submit-form':
+            self._in_form = True
+            self.action = attrs.get('action')
+        elif tag == 'input' and self._in_form and attrs.get('name'):
+            self.data[attrs['name']] = attrs.get('value') or ''
+
+    def handle_endtag(self, tag):
+        if tag == 'form':
+            self._in_form = False
+
+
+def parse_submit_form(html):
+    parser = SubmitFormParser()
+    parser.feed(html)
+    parser.close()
+    return parser.action, parser.data
+
+
+def create_orders(numbers, amount):
+    try:
+        from oscar.test.factories import create_order
+    except ImportError:
+        raise CommandError("--create-orders needs the test dependencies of "
+                           "Oscar (factory_boy)")
+    Order = apps.get_model('order', 'Order')
+    for number in numbers:
+        order = create_order(number=number, status='Pending')
+        Order.objects.filter(pk=order.pk).update(total_incl_tax=amount)
+
+
+def checkout_session(order_id):
+    """
+    Key of a new session of the shop, checking out the order ``order_id``.
+    """
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session['checkout_order_id'] = order_id
+    session.save()
+    return session.session_key
+
+
+class Command(BaseCommand):
+    help = "Run concurrent checkouts through the redirection page of the " \
+           "shop, against the SystemPay simulator (see the " \
+           "systempay_simulator command and the SYSTEMPAY_GATEWAY_URL " \
+           "setting)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('redirect_url',
+                            help="Url of the redirection page of the "
+                                 "running shop, e.g. http://127.0.0.1:8000/"
+                                 "checkout/systempay/secure-redirect")
+        parser.add_argument('--checkouts', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--prefix',
+                            help="Prefix of the numbers of the orders "
+                                 "checked out (default with "
+                                 "--create-orders: L and the current time)")
+        parser.add_argument('--create-orders', action='store_true',
+                            help="Create the Oscar orders (needs "
+                                 "factory_boy)")
+        parser.add_argument('--amount', type=D, default=D('19.04'),
+                            help="Total of the created orders")
+        parser.add_argument('--follow', action='store_true',
+                            help="Follow the redirection to the return page "
+                                 "of the shop")
+        parser.add_argument('--wait', type=float, default=10,
+                            help="Seconds to wait for the IPNs")
+        parser.add_argument('--output', '-o',
+                            help="JSON file of the results")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if options['create_orders']:
+            prefix = prefix or 'L%d' % time.time()
+            create_orders(['%s%06d' % (prefix, i)
+                           for i in range(options['checkouts'])],
+                          options['amount'])
+        elif not prefix:
+            raise CommandError("Give the --prefix of existing orders, or "
+                               "--create-orders")
+
+        Order = apps.get_model('order', 'Order')
+        order_ids = list(
+            Order.objects.filter(number__range=prefix_range(prefix))
+            .order_by('number')
+            .values_list('pk', flat=True)[:options['checkouts']])
+        if not order_ids:
+            raise CommandError("No order numbered '%s...'" % prefix)
+
+        # the sessions are created beforehand, only the round trips to the
+        # shop and the platform are measured
+        sessions = [checkout_session(order_id) for order_id in order_ids]
+
+        statuses = Counter()
+        durations = []
+        lock = threading.Lock()
+
+        def checkout(session_key):
+            start = time.perf_counter()
+            try:
+                client = requests.Session()
+                client.cookies[settings.SESSION_COOKIE_NAME] = session_key
+                page = client.get(options['redirect_url'], timeout=60)
+                page.raise_for_status()
+                action, data = parse_submit_form(page.text)
+                response = client.post(action, data=data, timeout=60,
+                                       allow_redirects=options['follow'])
+                status = response.status_code
+            except requests.HTTPError as e:
+                status = 'redirect-%s' % e.response.status_code
+            except requests.RequestException as e:
+                status = e.__class__.__name__
+            with lock:
+                durations.append(time.perf_counter() - start)
+                statuses[status] += 1
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            list(pool.map(checkout, sessions))
+        elapsed = time.perf_counter() - start
+
+        # the IPNs are sent in the background by the simulator
+        deadline = time.time() + options['wait']
+        responses = SystemPayTransaction.objects.filter(
+            mode=SystemPayTransaction.MODE_RESPONSE,
+            order_number__range=prefix_range(prefix))
+        while True:
+            notified = responses.count()
+            if notified >= len(sessions) or time.time() >= deadline:
+                break
+            time.sleep(0.5)
+
+        durations.sort()
+        results = {
+            'checkouts': len(sessions),
+            'concurrency': options['concurrency'],
+            'seconds': elapsed,
+            'checkouts_per_second': len(sessions) / elapsed,
+            'p50': percentile(durations, 0.5),
+            'p95': percentile(durations, 0.95),
+            'p99': percentile(durations, 0.99),
+            'statuses': {str(k): v for k, v in statuses.items()},
+            'notified': notified,
+        }
+        report = json.dumps(results, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report)
+        self.stdout.write(report)
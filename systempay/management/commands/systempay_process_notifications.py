@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from systempay import notifications
+
+
+class Command(BaseCommand):
+    help = "Process the queued SystemPay notifications (asynchronous IPN)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=notifications.BATCH_SIZE)
+        parser.add_argument('--max-attempts', type=int,
+                            default=notifications.MAX_ATTEMPTS,
+                            help="Attempts before a notification is marked "
+                                 "as failed")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep polling the queue")
+        parser.add_argument('--sleep', type=float, default=1.0,
+                            help="Seconds to wait when the queue is empty")
+
+    def handle(self, *args, **options):
+        while True:
+            count = notifications.process_notifications(
+                options['batch_size'], options['max_attempts'])
+            if count:
+                self.stdout.write("%d notification(s) processed" % count)
+            if count < options['batch_size']:
+                if not options['loop']:
+                    break
+                time.sleep(options['sleep'])
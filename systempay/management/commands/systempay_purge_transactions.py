@@ -0,0 +1,66 @@
+import datetime
+import gzip
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from systempay import retention
+from systempay.models import SystemPayTransaction
+
+
+class Command(BaseCommand):
+    help = "Delete the old SystemPay transactions, archiving the responses"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--submit-days', type=int,
+                            default=getattr(
+                                settings, 'SYSTEMPAY_RETENTION_SUBMIT_DAYS',
+                                None),
+                            help="Days the submitted transactions are kept")
+        parser.add_argument('--response-months', type=int,
+                            default=getattr(
+                                settings,
+                                'SYSTEMPAY_RETENTION_RESPONSE_MONTHS', None),
+                            help="Months the responses are kept")
+        parser.add_argument('--archive',
+                            help="Gzipped NDJSON file receiving the deleted "
+                                 "responses, appended to if it exists")
+        parser.add_argument('--no-archive', action='store_true',
+                            help="Delete the responses without archiving "
+                                 "them")
+        parser.add_argument('--chunk-size', type=int,
+                            default=retention.CHUNK_SIZE)
+        parser.add_argument('--pause', type=float, default=0,
+                            help="Seconds to wait between chunks")
+
+    def handle(self, *args, **options):
+        today = timezone.localtime(timezone.now()) if settings.USE_TZ \
+            else datetime.datetime.now()
+        today = today.replace(hour=0, minute=0, second=0, microsecond=0)
+        chunk_options = {'chunk_size': options['chunk_size'],
+                         'pause': options['pause']}
+
+        if options['submit_days'] is not None:
+            count = retention.purge_transactions(
+                SystemPayTransaction.MODE_SUBMIT,
+                today - datetime.timedelta(days=options['submit_days']),
+                **chunk_options)
+            self.stdout.write("%d submitted transaction(s) deleted" % count)
+
+        if options['response_months'] is not None:
+            if not options['archive'] and not options['no_archive']:
+                raise CommandError("The responses are deleted, give an "
+                                   "--archive file or --no-archive")
+            before = retention.months_ago(today, options['response_months'])
+            if options['archive']:
+                with gzip.open(options['archive'], 'at',
+                               encoding='utf8') as archive:
+                    count = retention.purge_transactions(
+                        SystemPayTransaction.MODE_RESPONSE, before,
+                        archive=archive, **chunk_options)
+            else:
+                count = retention.purge_transactions(
+                    SystemPayTransaction.MODE_RESPONSE, before,
+                    **chunk_options)
+            self.stdout.write("%d response(s) deleted" % count)
@@ -0,0 +1,36 @@
+import datetime
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from systempay import reconciliation
+from systempay.utils import parse_day
+
+
+class Command(BaseCommand):
+    help = "Check the orders notified as paid by SystemPay against their " \
+           "payment sources and events"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=parse_day,
+                            help="First day checked (YYYY-MM-DD, default: "
+                                 "yesterday)")
+        parser.add_argument('--until', type=parse_day,
+                            help="Day after the last day checked "
+                                 "(YYYY-MM-DD, default: the day after "
+                                 "--since)")
+
+    def handle(self, *args, **options):
+        since = options['since']
+        if since is None:
+            since = parse_day((datetime.date.today() -
+                               datetime.timedelta(days=1)).isoformat())
+        until = options['until'] or since + datetime.timedelta(days=1)
+
+        kinds = Counter()
+        for issue in reconciliation.reconcile(since, until):
+            kinds[issue.kind] += 1
+            self.stdout.write("Order #%s: %s %s" % issue)
+        for kind, count in sorted(kinds.items()):
+            self.stdout.write("%s: %d" % (kind, count))
+        self.stdout.write("%d issue(s)" % sum(kinds.values()))
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from systempay.models import SystemPayTransaction
+from systempay.utils import (RAW_FORMAT_URLENCODE, RAW_FORMATS,
+                             decode_raw_request, encode_raw_request,
+                             get_raw_format)
+
+
+class Command(BaseCommand):
+    help = "Rewrite the raw_request of the stored SystemPay transactions " \
+           "in another format"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=RAW_FORMATS,
+                            default=getattr(settings,
+                                            'SYSTEMPAY_RAW_REQUEST_FORMAT',
+                                            RAW_FORMAT_URLENCODE),
+                            help="Target format (default: "
+                                 "SYSTEMPAY_RAW_REQUEST_FORMAT)")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Rows rewritten per database transaction")
+
+    def handle(self, *args, **options):
+        format = options['format']
+        last_pk = 0
+        count = 0
+        while True:
+            rows = list(SystemPayTransaction.objects
+                        .filter(pk__gt=last_pk)
+                        .order_by('pk')
+                        .values_list('pk', 'raw_request')
+                        [:options['batch_size']])
+            if not rows:
+                break
+            with transaction.atomic():
+                for pk, raw_request in rows:
+                    if not raw_request or \
+                            get_raw_format(raw_request) == format:
+                        continue
+                    data = {k: v[0] for k, v in
+                            decode_raw_request(raw_request).items()}
+                    SystemPayTransaction.objects.filter(pk=pk).update(
+                        raw_request=encode_raw_request(data, format))
+                    count += 1
+            last_pk = rows[-1][0]
+        self.stdout.write("%d transaction(s) rewritten" % count)
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from systempay.facade import get_registry
+from systempay.simulator import Simulator, make_simulator_server
+
+
+def parse_results(value):
+    """
+    Parse weighted result codes, e.g. ``00=9,05=1``.
+    """
+    results = {}
+    for item in value.split(','):
+        code, _, weight = item.partition('=')
+        results[code.strip()] = float(weight or 1)
+    return results
+
+
+class Command(BaseCommand):
+    help = "Run a local simulator of the SystemPay platform, for load tests"
+
+    def add_arguments(self, parser):
+        parser.add_argument('ipn_url',
+                            help="Url of the IPN view of the shop, e.g. "
+                                 "http://127.0.0.1:8000/checkout/systempay/"
+                                 "handle-ipn")
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--results', type=parse_results,
+                            default={'00': 1},
+                            help="Weighted result codes (default: 00=1)")
+        parser.add_argument('--latency', type=float, default=0,
+                            help="Seconds before an IPN is sent")
+        parser.add_argument('--duplicates', type=float, default=0,
+                            help="Share of the IPNs sent twice")
+        parser.add_argument('--retries', type=int, default=3,
+                            help="Attempts after a failed IPN")
+        parser.add_argument('--retry-delay', type=float, default=1.0,
+                            help="Seconds before the first retry, doubled "
+                                 "at each attempt")
+        parser.add_argument('--workers', type=int, default=20,
+                            help="Threads sending the IPNs")
+
+    def handle(self, *args, **options):
+        if options['duplicates'] < 0 or options['duplicates'] > 1:
+            raise CommandError("--duplicates is a share between 0 and 1")
+        simulator = Simulator(
+            get_registry().signature_settings(), options['ipn_url'],
+            results=options['results'], latency=options['latency'],
+            duplicates=options['duplicates'], retries=options['retries'],
+            retry_delay=options['retry_delay'], workers=options['workers'])
+        server = make_simulator_server(simulator, options['host'],
+                                       options['port'])
+        self.stdout.write("SystemPay simulator listening on "
+                          "http://%s:%s/vads-payment/"
+                          % (options['host'], options['port']))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            simulator.shutdown()
+            for name, count in sorted(simulator.stats.items()):
+                self.stdout.write("%s: %d" % (name, count))
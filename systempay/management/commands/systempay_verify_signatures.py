@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from systempay import verification
+from systempay.facade import get_registry
+from systempay.models import SystemPayTransaction
+from systempay.utils import parse_day
+
+
+class Command(BaseCommand):
+    help = "Verify the signature of the stored SystemPay transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=parse_day,
+                            help="First day verified (YYYY-MM-DD)")
+        parser.add_argument('--until', type=parse_day,
+                            help="Day after the last day verified "
+                                 "(YYYY-MM-DD)")
+        parser.add_argument('--mode',
+                            choices=[m for m, _ in
+                                     SystemPayTransaction.MODE_CHOICES])
+        parser.add_argument('--processes', type=int,
+                            help="Number of processes (default: number of "
+                                 "CPUs)")
+        parser.add_argument('--chunk-size', type=int,
+                            default=verification.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        qs = SystemPayTransaction.objects.all()
+        if options['since']:
+            qs = qs.filter(date_created__gte=options['since'])
+        if options['until']:
+            qs = qs.filter(date_created__lt=options['until'])
+        if options['mode']:
+            qs = qs.filter(mode=options['mode'])
+
+        mismatches = verification.verify_transactions(
+            qs, get_registry().signature_settings(),
+            chunk_size=options['chunk_size'],
+            processes=options['processes'])
+
+        count = 0
+        for pk, expected, received in mismatches:
+            count += 1
+            self.stdout.write("SystemPayTransaction #%s: signature '%s' "
+                              "instead of '%s'" % (pk, received, expected))
+        self.stdout.write("%d mismatch(es)" % count)
@@ -0,0 +1,155 @@
+"""
+Instrumentation of the checkout, return and IPN flows.
+
+Timings and counts are sent to the backend set in
+``SYSTEMPAY_METRICS_BACKEND``, the dotted path of a `MetricsBackend`
+subclass. The default backend discards everything, and the timers are then
+not even started.
+
+Timings (in seconds):
+
+* ``systempay.view``, tagged with the ``view`` name
+* ``systempay.submit.form``: building of the submit form, signing included
+* ``systempay.submit.sign``: signing of the submit form
+* ``systempay.submit.db_write``: recording of the submitted transaction
+* ``systempay.ipn.verify``: signature verification of a notification
+* ``systempay.ipn.db_write``: recording of the notification
+* ``systempay.ipn.order_status``: update of the order, its source and its
+  payment event
+* ``systempay.cancel.order_status``: cancellation of the order
+
+Counts:
+
+* ``systempay.ipn.result``, tagged with the ``result`` and ``trans_status``
+  of the notification
+"""
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+class MetricsBackend(object):
+    """
+    Base class of the metrics backends.
+    """
+    # timers are skipped for disabled backends
+    enabled = True
+
+    def timing(self, name, seconds, **tags):
+        raise NotImplementedError
+
+    def increment(self, name, value=1, **tags):
+        raise NotImplementedError
+
+
+class NullMetrics(MetricsBackend):
+    """
+    Discard every metric.
+    """
+    enabled = False
+
+    def timing(self, name, seconds, **tags):
+        pass
+
+    def increment(self, name, value=1, **tags):
+        pass
+
+
+class MemoryMetrics(MetricsBackend):
+    """
+    Keep the metrics in memory, for tests.
+
+    ``timings`` maps ``(name, tags)`` to the list of the durations and
+    ``counts`` maps ``(name, tags)`` to a count, ``tags`` being a sorted
+    tuple of ``(tag, value)`` pairs.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.timings = defaultdict(list)
+        self.counts = Counter()
+
+    def timing(self, name, seconds, **tags):
+        self.timings[name, tuple(sorted(tags.items()))].append(seconds)
+
+    def increment(self, name, value=1, **tags):
+        self.counts[name, tuple(sorted(tags.items()))] += value
+
+    def timed(self, name):
+        """
+        Number of timings taken for ``name``, whatever their tags.
+        """
+        return sum(len(v) for (n, tags), v in self.timings.items()
+                   if n == name)
+
+
+class Timer(object):
+    __slots__ = ('backend', 'name', 'tags', 'start')
+
+    def __init__(self, backend, name, tags):
+        self.backend = backend
+        self.name = name
+        self.tags = tags
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.backend.timing(self.name, time.perf_counter() - self.start,
+                            **self.tags)
+        return False
+
+
+class NullTimer(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+_backend = None
+
+
+def get_metrics():
+    """
+    Return the metrics backend of the process, built from the settings.
+    """
+    global _backend
+    if _backend is None:
+        _backend = import_string(getattr(
+            settings, 'SYSTEMPAY_METRICS_BACKEND',
+            'systempay.metrics.NullMetrics'))()
+    return _backend
+
+
+def timer(name, **tags):
+    """
+    Context manager sending the duration of its block as ``name``.
+    """
+    backend = get_metrics()
+    if not backend.enabled:
+        return NULL_TIMER
+    return Timer(backend, name, tags)
+
+
+def increment(name, value=1, **tags):
+    get_metrics().increment(name, value, **tags)
+
+
+@receiver(setting_changed)
+def reset_metrics(setting, **kwargs):
+    global _backend
+    if setting == 'SYSTEMPAY_METRICS_BACKEND':
+        _backend = None
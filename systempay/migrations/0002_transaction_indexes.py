@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('systempay', '0001_initial'),
+    ]
+
+    operations = [
+        # Not related to the indexes: the choices of 0001_initial
+        # ('Submit', 'Return') were out of date with the model. This only
+        # updates the migration state, the column is left unchanged.
+        migrations.AlterField(
+            model_name='systempaytransaction',
+            name='mode',
+            field=models.CharField(choices=[('SUBMIT', 'SUBMIT'), ('RESPONSE', 'RESPONSE')], max_length=10),
+        ),
+        migrations.AlterIndexTogether(
+            name='systempaytransaction',
+            index_together=set([('mode', 'order_number', 'date_created'), ('trans_id', 'trans_date')]),
+        ),
+    ]
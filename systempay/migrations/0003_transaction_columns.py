@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('systempay', '0002_transaction_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='systempaytransaction',
+            name='card_brand',
+            field=models.CharField(blank=True, max_length=127, null=True),
+        ),
+        migrations.AddField(
+            model_name='systempaytransaction',
+            name='currency',
+            field=models.CharField(blank=True, max_length=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='systempaytransaction',
+            name='effective_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='systempaytransaction',
+            name='extra_result',
+            field=models.CharField(blank=True, max_length=2, null=True),
+        ),
+        migrations.AddField(
+            model_name='systempaytransaction',
+            name='trans_status',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from decimal import Decimal as D
+from urllib.parse import parse_qs
+
+from django.db import migrations, transaction
+
+# Rows updated per database transaction
+CHUNK_SIZE = 1000
+
+# Copy of ``systempay.models.CURRENCIES`` at the time of this migration
+CURRENCY_CODES = {
+    '36': 'AUD', '036': 'AUD', '124': 'CAD', '156': 'CNY', '208': 'DKK',
+    '392': 'YEN', '578': 'NOK', '752': 'SEK', '756': 'CHF', '826': 'GBP',
+    '840': 'USD', '953': 'CFP', '978': 'EUR',
+}
+
+
+def columns_from_raw_request(raw_request):
+    # the raw requests are still urlencoded at this point
+    ctx = parse_qs(raw_request or '', keep_blank_values=True)
+
+    def value(key):
+        return ctx[key][0] if key in ctx else None
+
+    effective_amount = value('vads_effective_amount')
+    return {
+        'currency': CURRENCY_CODES.get(str(value('vads_currency')),
+                                       'UNKNOWN'),
+        'trans_status': value('vads_trans_status'),
+        'card_brand': value('vads_card_brand'),
+        'extra_result': value('vads_extra_result'),
+        'effective_amount': (D(effective_amount) / 100
+                             if effective_amount else None),
+    }
+
+
+def backfill_columns(apps, schema_editor):
+    SystemPayTransaction = apps.get_model('systempay', 'SystemPayTransaction')
+    last_pk = 0
+    while True:
+        rows = list(SystemPayTransaction.objects
+                    .filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .values_list('pk', 'raw_request')[:CHUNK_SIZE])
+        if not rows:
+            break
+        with transaction.atomic():
+            for pk, raw_request in rows:
+                SystemPayTransaction.objects.filter(pk=pk).update(
+                    **columns_from_raw_request(raw_request))
+        last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    # Each chunk is committed on its own
+    atomic = False
+
+    dependencies = [
+        ('systempay', '0003_transaction_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('systempay', '0005_transaction_list_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='systempaytransaction',
+            name='order_number',
+            field=models.CharField(blank=True, db_index=True, max_length=127, null=True),
+        ),
+        migrations.AlterIndexTogether(
+            name='systempaytransaction',
+            index_together=set([('mode', 'order_number', 'date_created'), ('trans_id', 'trans_date'), ('date_created', 'id'), ('result', 'date_created'), ('operation_type', 'date_created'), ('trans_status', 'date_created')]),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('systempay', '0006_transaction_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='systempaytransaction',
+            name='notification_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
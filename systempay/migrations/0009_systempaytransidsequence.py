@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('systempay', '0008_systempaynotification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SystemPayTransIdSequence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('site_id', models.CharField(max_length=8)),
+                ('day', models.CharField(max_length=8)),
+                ('next_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='systempaytransidsequence',
+            unique_together=set([('site_id', 'day')]),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('systempay', '0009_systempaytransidsequence'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='systempaytransaction',
+            index_together=set([('mode', 'order_number', 'date_created'), ('trans_id', 'trans_date'), ('date_created', 'id'), ('result', 'date_created'), ('operation_type', 'date_created'), ('trans_status', 'date_created'), ('mode', 'date_created', 'id')]),
+        ),
+    ]
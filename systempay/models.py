@@ -1,8 +1,9 @@
-from urllib.parse import parse_qs
+from urllib.parse import urlencode
 
 from django.db import models
 
 from .exceptions import VADS_RESULT
+from .utils import decode_raw_request
 
 CURRENCIES = (
     ('36', 'AUD'),
@@ -19,6 +20,14 @@ CURRENCIES = (
     ('953', 'CFP'),
     ('978', 'EUR'),
 )
+CURRENCY_CODES = dict(CURRENCIES)
+
+
+def get_currency(code):
+    """
+    Return the alphabetic code of a SystemPay (ISO 4217 numeric) currency.
+    """
+    return CURRENCY_CODES.get(str(code), 'UNKNOWN')
 
 
 class SystemPayTransaction(models.Model):
@@ -55,21 +64,52 @@ class SystemPayTransaction(models.Model):
     # Need to respect the format ``YYYYMMDDHHMMSS`` in UTC timezone
     trans_date = models.CharField(max_length=14, blank=True, null=True)
 
-    order_number = models.CharField(max_length=127, blank=True, null=True)
+    order_number = models.CharField(max_length=127, blank=True, null=True,
+                                    db_index=True)
     amount = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    effective_amount = models.DecimalField(max_digits=12, decimal_places=2,
+                                           blank=True, null=True)
+    # Alphabetic code of ``vads_currency``, eg. EUR
     currency = models.CharField(max_length=8, blank=True, null=True)
 
     auth_result = models.CharField(max_length=2, blank=True, null=True)
     result = models.CharField(max_length=2, blank=True, null=True)
+    extra_result = models.CharField(max_length=2, blank=True, null=True)
+    trans_status = models.CharField(max_length=64, blank=True, null=True)
+    card_brand = models.CharField(max_length=127, blank=True, null=True)
 
     error_message = models.TextField(max_length=512, blank=True, null=True)
 
+    # Status of the payment in the daily reports of the back-office, there
+    # is no notification of the captures
+    capture_status = models.CharField(max_length=64, blank=True, null=True)
+    date_captured = models.DateTimeField(blank=True, null=True)
+
+    # Identifies a valid notification: SystemPay resends a notification
+    # until it is acknowledged, see ``get_notification_key``
+    notification_key = models.CharField(max_length=64, unique=True,
+                                        blank=True, null=True, editable=False)
+
     # Debug information
     raw_request = models.TextField(max_length=512)
     date_created = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ('-date_created', )
+        index_together = (
+            # latest response of an order (customer return page)
+            ('mode', 'order_number', 'date_created'),
+            # notification lookups (IPN reconciliation)
+            ('trans_id', 'trans_date'),
+            # dashboard list (keyset pagination)
+            ('date_created', 'id'),
+            # dashboard search
+            ('result', 'date_created'),
+            ('operation_type', 'date_created'),
+            ('trans_status', 'date_created'),
+            # retention (oldest rows of a mode)
+            ('mode', 'date_created', 'id'),
+        )
 
     def __str__(self):
         return 'SystemPayTransaction mode: %(mode)s order_id: %(order_id)s ' \
@@ -77,6 +117,21 @@ class SystemPayTransaction(models.Model):
                                            'order_id': self.order_number,
                                            'trans_id': self.trans_id, }
 
+    @staticmethod
+    def get_notification_key(data):
+        """
+        Key of the notification described by ``data``: a transaction is
+        identified by its id on its day, for a given shop, and a notification
+        by the sequence number of its payment.
+        """
+        site_id = data.get('vads_site_id')
+        trans_date = data.get('vads_trans_date')
+        trans_id = data.get('vads_trans_id')
+        if not (site_id and trans_date and trans_id):
+            return None
+        return '%s-%s-%s-%s' % (site_id, trans_date[:8], trans_id,
+                                data.get('vads_sequence_number') or '')
+
     def request(self):
         return self._as_table(self.context)
     request.allow_tags = True
@@ -89,9 +144,27 @@ class SystemPayTransaction(models.Model):
                 rows.append('<tr><th>%s</th><td>%s</td></tr>' % (k, v[0]))
         return '<table>%s</table>' % ''.join(rows)
 
+    # ``raw_request`` as last parsed and the result, see ``context``
+    _context_raw = _context = None
+
     @property
     def context(self):
-        return parse_qs(self.raw_request, keep_blank_values=True)
+        """
+        Parsed ``raw_request``, whatever its storage format. It is parsed
+        once per instance, and again only after a new value is assigned to
+        ``raw_request``.
+        """
+        if self._context is None or self._context_raw is not self.raw_request:
+            self._context = decode_raw_request(self.raw_request)
+            self._context_raw = self.raw_request
+        return self._context
+
+    @property
+    def raw_params(self):
+        """
+        ``raw_request`` url-encoded, for display.
+        """
+        return urlencode(sorted(self.context.items()), doseq=True)
 
     def value(self, key):
         ctx = self.context
@@ -105,41 +178,109 @@ class SystemPayTransaction(models.Model):
         """
         Compute the signature on the fly.
         """
-        params = {}
-        from .facade import Facade
-        f = Facade()
-        for k, v in self.context.items():
-            params.update({k: v[0]})
-        form = f.gateway.get_return_form(**params)
-        return f.gateway.compute_signature(form)
-
-    @property
-    def currency(self):
-        return dict(CURRENCIES).get(self.value('vads_currency'), 'UNKNOWN')
+        from .facade import get_registry
+        from .verification import compute_signature
+        gateway = get_registry().for_shop(self.value('vads_site_id')).gateway
+        return compute_signature(gateway.signature_algorithm, self.mode,
+                                 self.context)
 
     @property
     def reference(self):
         return self.trans_id
 
+    # Substrings of the parameters shown by a non verbose ``debug()``
+    DEBUG_PARAMS = ('amount', 'auth_result', 'order_id', 'trans_status',
+                    'check_src', 'operation_type')
+
     def debug(self, verbose=False):
-        res = self.raw_request.split('&')
-        if not verbose:
-            li = []
-            values = ('amount', 'auth_result', 'order_id', 'trans_status',
-                      'check_src', 'operation_type')
-            for item in res:
-                for v in values:
-                    if v in item:
-                        li.append(item.split('vads_')[1])
-            res = li
-        return sorted(res)
+        items = self.context.items()
+        if verbose:
+            return sorted('%s=%s' % (k, v[0]) for k, v in items)
+        return sorted('%s=%s' % (k[5:], v[0]) for k, v in items
+                      if k.startswith('vads_') and
+                      any(p in k for p in self.DEBUG_PARAMS))
 
     @property
     def result_message(self):
         result = self.result or ''
         return '%s - %s' % (result, VADS_RESULT.get(self.result, ''))
 
-    @property
-    def trans_status(self):
-        return self.value('vads_trans_status')
 
+class SystemPayNotification(models.Model):
+    """
+    Notification received from SystemPay, queued to be processed later by
+    the ``systempay_process_notifications`` command.
+
+    Only used when the IPN are handled asynchronously, see the
+    ``SYSTEMPAY_ASYNC_IPN`` setting.
+    """
+
+    STATUS_PENDING, STATUS_PROCESSED, STATUS_FAILED = (
+        'PENDING', 'PROCESSED', 'FAILED')
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'PENDING'),
+        (STATUS_PROCESSED, 'PROCESSED'),
+        (STATUS_FAILED, 'FAILED'),
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default=STATUS_PENDING)
+
+    raw_request = models.TextField()
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error_message = models.TextField(blank=True, null=True)
+
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_processed = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ('id', )
+        index_together = (
+            # queue polling
+            ('status', 'id'),
+        )
+
+    def __str__(self):
+        return 'SystemPayNotification #%s status: %s' % (self.id, self.status)
+
+
+class SystemPayTransIdSequence(models.Model):
+    """
+    Daily sequence of the transaction ids of a shop, see
+    ``systempay.allocators.DatabaseTransIdAllocator``.
+    """
+    site_id = models.CharField(max_length=8)
+    # ``YYYYMMDD`` in UTC timezone
+    day = models.CharField(max_length=8)
+    next_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('site_id', 'day'), )
+
+    def __str__(self):
+        return 'SystemPayTransIdSequence site_id: %s day: %s next: %s' % (
+            self.site_id, self.day, self.next_value)
+
+
+class SystemPayReportImport(models.Model):
+    """
+    Progress of the import of a back-office report file, see the
+    ``systempay_import_report`` command. An interrupted import resumes after
+    the last committed line.
+    """
+    file_name = models.CharField(max_length=255)
+    file_size = models.BigIntegerField()
+
+    lines_done = models.PositiveIntegerField(default=0)
+    matched = models.PositiveIntegerField(default=0)
+    unmatched = models.PositiveIntegerField(default=0)
+    is_complete = models.BooleanField(default=False)
+
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (('file_name', 'file_size'), )
+
+    def __str__(self):
+        return 'SystemPayReportImport %s: %d lines' % (self.file_name,
+                                                        self.lines_done)
@@ -0,0 +1,71 @@
+"""
+Asynchronous handling of the Instant Payment Notifications (IPN).
+
+When ``SYSTEMPAY_ASYNC_IPN`` is set, the IPN view only checks the signature
+of a notification and queues it. The notifications are then processed in
+batches by the ``systempay_process_notifications`` command, several
+instances of which can run in parallel.
+"""
+import logging
+
+from django.db import connections, router, transaction
+from django.http import QueryDict
+from django.utils import timezone
+
+from .models import SystemPayNotification
+
+logger = logging.getLogger('systempay')
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 5
+
+
+def enqueue_notification(data):
+    """
+    Store the data of a notification to process it later.
+    """
+    return SystemPayNotification.objects.create(raw_request=data.urlencode())
+
+
+def process_notifications(batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS):
+    """
+    Process a batch of pending notifications, return their number.
+
+    The notifications of the batch stay locked until the batch is done, and
+    rows locked by another worker are skipped. Skipping locked rows needs
+    Django 1.11 and a database supporting it, the workers otherwise wait for
+    each other's batch.
+    """
+    from .views import IpnView
+
+    qs = SystemPayNotification.objects.all()
+    connection = connections[router.db_for_write(SystemPayNotification)]
+    if getattr(connection.features,
+               'has_select_for_update_skip_locked', False):
+        qs = qs.select_for_update(skip_locked=True)
+    else:
+        qs = qs.select_for_update()
+
+    with transaction.atomic():
+        notifications = list(
+            qs.filter(status=SystemPayNotification.STATUS_PENDING)
+            .order_by('id')[:batch_size])
+
+        for notification in notifications:
+            notification.attempts += 1
+            try:
+                IpnView().handle_notification(
+                    QueryDict(notification.raw_request))
+            except Exception as e:
+                logger.exception("Unable to process %s", notification)
+                notification.error_message = str(e)
+                if notification.attempts >= max_attempts:
+                    notification.status = SystemPayNotification.STATUS_FAILED
+            else:
+                notification.status = SystemPayNotification.STATUS_PROCESSED
+                notification.error_message = None
+                notification.date_processed = timezone.now()
+            notification.save(update_fields=[
+                'status', 'attempts', 'error_message', 'date_processed'])
+
+    return len(notifications)
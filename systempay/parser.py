@@ -0,0 +1,90 @@
+"""
+Fast path validation of the notifications, equivalent to
+``SystemPayNotificationForm`` without the cost of a Django form.
+
+The signature is checked first, over the raw data, and the fields are only
+validated for a signed notification. The validation rules are read once
+from the fields of the form.
+"""
+from django.utils.encoding import force_text
+from django.utils.translation import ugettext as _
+
+from .forms import SystemPayNotificationForm, sorted_vads_params
+
+NOTIFICATION_FIELDS = tuple(SystemPayNotificationForm.base_fields)
+
+
+class Notification(object):
+    """
+    Cleaned data of a notification, as one attribute per field of
+    ``SystemPayNotificationForm``.
+    """
+    __slots__ = NOTIFICATION_FIELDS
+
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+
+def field_rules(form_class):
+    """
+    Validation rules of the fields of ``form_class``, as tuples
+    ``(name, required, min_length, max_length, choices)``.
+    """
+    rules = []
+    for name, field in form_class.base_fields.items():
+        choices = getattr(field, 'choices', None)
+        if choices is not None:
+            choices = frozenset(force_text(c[0]) for c in choices)
+        rules.append((name, field.required,
+                      getattr(field, 'min_length', None),
+                      getattr(field, 'max_length', None),
+                      choices))
+    return tuple(rules)
+
+
+class NotificationParser(object):
+
+    def __init__(self, algorithm, form_class=SystemPayNotificationForm):
+        self._algorithm = algorithm
+        self._rules = field_rules(form_class)
+
+    def check_signature(self, data):
+        """
+        Return a tuple ``(valid, expected signature, signature received)``.
+        """
+        values = tuple([force_text(data.get(p, ''), encoding='utf8')
+                        for p in sorted_vads_params(frozenset(data))])
+        expected = self._algorithm.sign(values)
+        received = data.get('signature', '')
+        return self._algorithm.compare(expected, received), expected, \
+            received
+
+    def clean(self, data):
+        """
+        Return a tuple ``(notification, errors)`` where ``errors`` is a
+        printable string of the errors of the fields, or ``None``.
+        """
+        notification = Notification()
+        errors = []
+        for name, required, min_length, max_length, choices in self._rules:
+            value = data.get(name, '')
+            value = value.strip() if value else ''
+            setattr(notification, name, value)
+            if not value:
+                if required:
+                    errors.append('%s: %s' % (name,
+                                              _("This field is required.")))
+                continue
+            if choices is not None and value not in choices:
+                errors.append('%s: %s' % (
+                    name, _("Select a valid choice. %s is not one of the "
+                            "available choices.") % value))
+            elif max_length is not None and len(value) > max_length:
+                errors.append('%s: %s' % (
+                    name, _("Ensure this value has at most %d characters.")
+                    % max_length))
+            elif min_length is not None and len(value) < min_length:
+                errors.append('%s: %s' % (
+                    name, _("Ensure this value has at least %d characters.")
+                    % min_length))
+        return notification, ' / '.join(errors) or None
@@ -0,0 +1,139 @@
+"""
+Reconciliation of the SystemPay transactions with the Oscar orders.
+
+The orders notified during a period are selected, and all their successful
+notifications, whatever their date, are compared with the orders, payment
+sources and payment events they should have produced. Every side is
+aggregated by order in a single query, the orders being selected by a
+subquery on the notifications, and the aggregates are then matched in
+memory: a day of orders is checked with a handful of queries.
+"""
+from collections import namedtuple
+from decimal import Decimal as D
+
+from django.apps import apps
+from django.db.models import Case, Count, DecimalField, F, Sum, When
+
+from .models import SystemPayTransaction
+
+Issue = namedtuple('Issue', ('order_number', 'kind', 'detail'))
+
+# kinds of issues
+MISSING_ORDER = 'missing_order'
+MISSING_SOURCE = 'missing_source'
+DUPLICATE_SOURCE = 'duplicate_source'
+AMOUNT_MISMATCH = 'amount_mismatch'
+
+
+def signed_amount(field, **credit_condition):
+    """
+    Sum of ``field``, counted negatively for the credits.
+    """
+    return Sum(Case(When(then=F(field) * -1, **credit_condition),
+                    default=F(field),
+                    output_field=DecimalField(max_digits=12,
+                                              decimal_places=2)))
+
+
+def debit_amount(field, **debit_condition):
+    return Sum(Case(When(then=F(field), **debit_condition),
+                    default=0,
+                    output_field=DecimalField(max_digits=12,
+                                              decimal_places=2)))
+
+
+def cents(amount):
+    """
+    ``amount`` rounded to the cent, the sums of some databases are floats.
+    """
+    return D(amount or 0).quantize(D('0.01'))
+
+
+def successful_notifications(since=None, until=None):
+    qs = SystemPayTransaction.objects.filter(
+        mode=SystemPayTransaction.MODE_RESPONSE,
+        result='00',
+        error_message__isnull=True,
+        operation_type__in=(SystemPayTransaction.OPERATION_TYPE_DEBIT,
+                            SystemPayTransaction.OPERATION_TYPE_CREDIT))
+    if since:
+        qs = qs.filter(date_created__gte=since)
+    if until:
+        qs = qs.filter(date_created__lt=until)
+    return qs
+
+
+def reconcile(since=None, until=None):
+    """
+    Return the issues of the orders notified as paid between ``since`` and
+    ``until``, sorted by order number.
+
+    The notifications of these orders are summed over their whole history,
+    like their sources and payment events: a refund notified after
+    ``until`` is taken into account.
+    """
+    Order = apps.get_model('order', 'Order')
+    Source = apps.get_model('payment', 'Source')
+    PaymentEvent = apps.get_model('payment', 'PaymentEvent')
+
+    numbers = successful_notifications(since, until).order_by().values(
+        'order_number')
+    txns = successful_notifications().filter(order_number__in=numbers)
+
+    # notifications, amounts debited and net amounts notified, by order
+    notified = {
+        number: (count, cents(debited), cents(net))
+        for number, count, debited, net in
+        txns.order_by().values_list('order_number').annotate(
+            count=Count('id'),
+            debited=debit_amount(
+                'amount',
+                operation_type=SystemPayTransaction.OPERATION_TYPE_DEBIT),
+            net=signed_amount(
+                'amount',
+                operation_type=SystemPayTransaction.OPERATION_TYPE_CREDIT))}
+
+    totals = dict(Order.objects.filter(number__in=numbers)
+                  .values_list('number', 'total_incl_tax'))
+
+    sources = {
+        number: (count, cents(debited) - cents(refunded))
+        for number, count, debited, refunded in
+        Source.objects.filter(source_type__name='systempay',
+                              order__number__in=numbers)
+        .order_by().values_list('order__number')
+        .annotate(count=Count('id'), debited=Sum('amount_debited'),
+                  refunded=Sum('amount_refunded'))}
+
+    events = {
+        number: cents(net) for number, net in
+        PaymentEvent.objects.filter(order__number__in=numbers)
+        .order_by().values_list('order__number')
+        .annotate(net=signed_amount(
+            'amount', event_type__name__startswith=(
+                SystemPayTransaction.OPERATION_TYPE_CREDIT)))}
+
+    issues = []
+    for number in sorted(notified):
+        notifications, debited, amount = notified[number]
+        if number not in totals:
+            issues.append(Issue(number, MISSING_ORDER, ''))
+            continue
+        count, source_amount = sources.get(number, (0, None))
+        if not count:
+            issues.append(Issue(number, MISSING_SOURCE,
+                                "notified %s" % amount))
+            continue
+        # each notification registers its own source
+        if count > notifications:
+            issues.append(Issue(number, DUPLICATE_SOURCE,
+                                "%d sources" % count))
+        total = cents(totals[number])
+        event_amount = events.get(number)
+        if debited != total or source_amount != amount or \
+                event_amount != amount:
+            issues.append(Issue(
+                number, AMOUNT_MISMATCH,
+                "order %s, notified %s (net %s), sources %s, events %s" % (
+                    total, debited, amount, source_amount, event_amount)))
+    return issues
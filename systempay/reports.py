@@ -0,0 +1,133 @@
+"""
+Import of the daily transaction reports of the SystemPay back-office.
+
+There is no notification of the captures, their status is read from the
+CSV reports instead. A report is read line by line and its rows are matched
+by batches with the notifications, on the day of ``trans_date`` and
+``trans_id`` (through the ``(trans_id, trans_date)`` index). Each batch is
+saved in one database transaction with the progress of the import, so that
+an interrupted import resumes after its last batch.
+"""
+import csv
+import datetime
+import gzip
+import io
+import os
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SystemPayReportImport, SystemPayTransaction
+
+# Rows matched per database transaction, the ids of a batch are bound as
+# query parameters
+BATCH_SIZE = 500
+
+# Columns of the report, by meaning
+COLUMNS = {
+    'trans_id': 'TRANSACTION_ID',
+    'trans_date': 'TRANSACTION_DATE',
+    'capture_status': 'STATUS',
+    'date_captured': 'CAPTURE_DATE',
+}
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def open_report(path, encoding='utf8'):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding=encoding, newline='')
+    return io.open(path, encoding=encoding, newline='')
+
+
+class ReportImporter(object):
+    """
+    Importer of report files.
+
+    :columns: names of the columns, see ``COLUMNS``
+    :date_format: format of the dates, in UTC
+    """
+
+    def __init__(self, columns=None, date_format=DATE_FORMAT,
+                 delimiter=';', batch_size=BATCH_SIZE):
+        self.columns = dict(COLUMNS, **(columns or {}))
+        self.date_format = date_format
+        self.delimiter = delimiter
+        self.batch_size = batch_size
+
+    def parse_date(self, value):
+        if not value:
+            return None
+        dt = datetime.datetime.strptime(value.strip(), self.date_format)
+        if settings.USE_TZ:
+            dt = timezone.make_aware(dt, timezone.utc)
+        return dt
+
+    def parse_row(self, row):
+        """
+        Return ``(day, trans_id, capture_status, date_captured)``.
+        """
+        columns = self.columns
+        trans_date = self.parse_date(row[columns['trans_date']])
+        return (trans_date.strftime('%Y%m%d'),
+                row[columns['trans_id']].strip().zfill(6),
+                row[columns['capture_status']].strip() or None,
+                self.parse_date(row.get(columns['date_captured'])))
+
+    def import_file(self, path):
+        """
+        Import the report ``path``, or resume its import, and return its
+        ``SystemPayReportImport``.
+        """
+        progress, created = SystemPayReportImport.objects.get_or_create(
+            file_name=os.path.basename(path),
+            file_size=os.path.getsize(path))
+        if progress.is_complete:
+            return progress
+
+        with open_report(path) as report:
+            reader = csv.DictReader(report, delimiter=self.delimiter)
+            # the lines of the previous runs are parsed again, not matched
+            rows = islice(reader, progress.lines_done, None)
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                with transaction.atomic():
+                    if batch:
+                        self.save_batch(progress, batch)
+                    progress.lines_done += len(batch)
+                    progress.is_complete = len(batch) < self.batch_size
+                    progress.save()
+                if progress.is_complete:
+                    return progress
+
+    def save_batch(self, progress, batch):
+        parsed = [self.parse_row(row) for row in batch]
+        days = sorted(day for day, _, _, _ in parsed)
+        after_last_day = (datetime.datetime.strptime(days[-1], '%Y%m%d') +
+                          datetime.timedelta(days=1)).strftime('%Y%m%d')
+
+        # notifications of the batch, by (day, trans_id)
+        txns = defaultdict(list)
+        for pk, trans_id, trans_date in SystemPayTransaction.objects.filter(
+                trans_id__in=set(t for _, t, _, _ in parsed),
+                trans_date__gte=days[0],
+                trans_date__lt=after_last_day,
+                mode=SystemPayTransaction.MODE_RESPONSE,
+        ).order_by().values_list('pk', 'trans_id', 'trans_date'):
+            txns[trans_date[:8], trans_id].append(pk)
+
+        # one update per capture status and date, the captures of a day
+        # usually share their date
+        updates = defaultdict(list)
+        for day, trans_id, capture_status, date_captured in parsed:
+            pks = txns.get((day, trans_id))
+            if pks:
+                updates[capture_status, date_captured].extend(pks)
+                progress.matched += 1
+            else:
+                progress.unmatched += 1
+        for (capture_status, date_captured), pks in updates.items():
+            SystemPayTransaction.objects.filter(pk__in=pks).update(
+                capture_status=capture_status, date_captured=date_captured)
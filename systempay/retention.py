@@ -0,0 +1,64 @@
+"""
+Retention of the stored transactions.
+
+Old transactions are deleted by small chunks, each one in its own database
+transaction, so that a purge never holds long locks on a live database. The
+chunks are read in ``(mode, date_created, id)`` order, through the index of
+the same name. Deleted rows can first be archived as NDJSON lines.
+"""
+import calendar
+import time
+
+from django.db import transaction
+
+from .export import EXPORT_FIELDS, ndjson_lines
+from .models import SystemPayTransaction
+
+# Rows deleted per database transaction
+CHUNK_SIZE = 500
+
+# Archived columns, ``raw_request`` is archived as stored
+ARCHIVE_FIELDS = EXPORT_FIELDS + ('notification_key', 'raw_request')
+
+
+def months_ago(dt, months):
+    """
+    Return ``dt`` moved ``months`` calendar months back, the day being
+    clamped to the end of the month.
+    """
+    month = dt.month - 1 - months
+    year, month = dt.year + month // 12, month % 12 + 1
+    day = min(dt.day, calendar.monthrange(year, month)[1])
+    return dt.replace(year=year, month=month, day=day)
+
+
+def purge_transactions(mode, before, archive=None, chunk_size=CHUNK_SIZE,
+                       pause=0):
+    """
+    Delete the transactions of ``mode`` created before the datetime
+    ``before``, return their number.
+
+    When ``archive`` is given, the rows of each chunk are written to this
+    text file as NDJSON lines before they are deleted. ``pause`` seconds
+    are waited between chunks, to leave room for the live traffic.
+    """
+    qs = SystemPayTransaction.objects.filter(
+        mode=mode, date_created__lt=before).order_by('date_created', 'id')
+    count = 0
+    while True:
+        with transaction.atomic():
+            pks = list(qs.values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                break
+            chunk = SystemPayTransaction.objects.filter(pk__in=pks)
+            if archive is not None:
+                archive.writelines(ndjson_lines(
+                    chunk.order_by('date_created', 'id'), ARCHIVE_FIELDS))
+                archive.flush()
+            chunk.delete()
+        count += len(pks)
+        if len(pks) < chunk_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return count
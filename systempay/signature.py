@@ -0,0 +1,77 @@
+"""
+Algorithms of the signature of the forms exchanged with SystemPay.
+
+The signed string is made of the values of the `vads_*` fields, sorted by
+field name, followed by the certificate, all joined by '+'.
+
+- SHA1: hexadecimal SHA-1 digest of the string.
+- HMAC-SHA-256: base64 encoded HMAC-SHA-256 of the string, keyed with the
+  certificate.
+
+An algorithm is built once per gateway and precomputes what only depends
+on the certificate.
+"""
+import base64
+import hashlib
+import hmac
+
+
+class SignatureAlgorithm(object):
+    name = None
+
+    def __init__(self, certificate):
+        self._suffix = ('+' + certificate).encode('utf8')
+
+    def message(self, values):
+        return '+'.join(values).encode('utf8') + self._suffix
+
+    def sign(self, values):
+        """
+        Return the signature of the sorted values of the `vads_*` fields.
+        """
+        raise NotImplementedError
+
+    def verify(self, values, signature):
+        """
+        Compare, in constant time, ``signature`` with the signature of the
+        values.
+        """
+        return self.compare(self.sign(values), signature)
+
+    @staticmethod
+    def compare(expected, signature):
+        return hmac.compare_digest(expected.encode('utf8'),
+                                   (signature or '').encode('utf8'))
+
+
+class Sha1Signature(SignatureAlgorithm):
+    name = 'SHA1'
+
+    def sign(self, values):
+        return hashlib.sha1(self.message(values)).hexdigest()
+
+
+class HmacSha256Signature(SignatureAlgorithm):
+    name = 'HMAC-SHA-256'
+
+    def __init__(self, certificate):
+        super(HmacSha256Signature, self).__init__(certificate)
+        # keyed state, copied for each signature
+        self._hmac = hmac.new(certificate.encode('utf8'),
+                              digestmod=hashlib.sha256)
+
+    def sign(self, values):
+        h = self._hmac.copy()
+        h.update(self.message(values))
+        return base64.b64encode(h.digest()).decode('ascii')
+
+
+ALGORITHMS = dict((cls.name, cls)
+                  for cls in (Sha1Signature, HmacSha256Signature))
+
+
+def get_signature_algorithm(name, certificate):
+    if name not in ALGORITHMS:
+        raise RuntimeError("Signature algorithm '%s' is not supported, use "
+                           "one of: %s" % (name, ', '.join(sorted(ALGORITHMS))))
+    return ALGORITHMS[name](certificate)
@@ -0,0 +1,210 @@
+"""
+Local simulator of the SystemPay payment platform, for load tests.
+
+The simulator is a WSGI application standing for the payment platform, see
+the `SYSTEMPAY_GATEWAY_URL` setting. It checks
+the signature of the submitted payment forms, redirects the customer to the
+return url of the shop and sends a signed Instant Payment Notification (IPN)
+to the shop, after a latency, with the result codes drawn from a weighted
+choice. Failed IPNs are sent again, and a share of them is sent twice to
+test the handling of replays.
+
+It is run by the ``systempay_simulator`` command, and the
+``systempay_load_test`` command drives concurrent checkouts through it.
+"""
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlencode
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import requests
+
+from .forms import sorted_vads_params
+from .signature import get_signature_algorithm
+
+logger = logging.getLogger('systempay')
+
+# Fields of the payment form sent back in the notification
+NOTIFIED_FIELDS = (
+    'vads_action_mode', 'vads_amount', 'vads_ctx_mode', 'vads_currency',
+    'vads_cust_email', 'vads_cust_id', 'vads_cust_name', 'vads_order_id',
+    'vads_page_action', 'vads_payment_config', 'vads_site_id',
+    'vads_trans_date', 'vads_trans_id', 'vads_version',
+)
+
+# Transaction status of the notifications, by result code
+TRANS_STATUS = {'00': 'AUTHORISED'}
+
+
+def signed_values(data):
+    """
+    Sorted values of the `vads_*` fields of ``data``, a dict.
+    """
+    return tuple([data[p] for p in sorted_vads_params(frozenset(data))])
+
+
+class Simulator(object):
+    """
+    WSGI application of the simulated platform.
+
+    :signature_settings: ``(algorithm name, certificate)`` by shop id
+     (`vads_site_id`), see `FacadeRegistry.signature_settings`
+    :ipn_url: url of the IPN view of the shop
+    :results: weights of the result codes, e.g. ``{'00': 9, '05': 1}``
+    :latency: seconds before the IPN is sent
+    :duplicates: share of the IPNs sent twice
+    :retries: attempts after a failed IPN, at exponential intervals from
+     ``retry_delay`` seconds
+    """
+
+    def __init__(self, signature_settings, ipn_url, results=None, latency=0,
+                 duplicates=0, retries=3, retry_delay=1.0, workers=20):
+        self.algorithms = {
+            shop: get_signature_algorithm(name, certificate)
+            for shop, (name, certificate) in signature_settings.items()
+            if shop is not None}
+        self.ipn_url = ipn_url
+        results = results or {'00': 1}
+        self.result_codes = list(results)
+        self.result_weights = [results[r] for r in self.result_codes]
+        self.latency = latency
+        self.duplicates = duplicates
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def __call__(self, environ, start_response):
+        if environ['REQUEST_METHOD'] != 'POST':
+            return self.respond(start_response, '405 Method Not Allowed')
+
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(length).decode('utf8')
+        data = {k: v[0] for k, v in
+                parse_qs(body, keep_blank_values=True).items()}
+
+        algorithm = self.algorithms.get(data.get('vads_site_id'))
+        if algorithm is None:
+            self.count('unknown_shop')
+            return self.respond(start_response, '400 Bad Request',
+                                'Unknown shop')
+        if not algorithm.verify(signed_values(data), data.get('signature')):
+            self.count('invalid_signature')
+            return self.respond(start_response, '400 Bad Request',
+                                'Invalid signature')
+
+        self.count('payments')
+        notification = self.notification(algorithm, data)
+        self._executor.submit(self.notify, notification)
+
+        if notification['vads_result'] == '00':
+            url = data.get('vads_url_success') or data.get('vads_url_return')
+        else:
+            url = data.get('vads_url_refused') or data.get('vads_url_return')
+        if not url:
+            return self.respond(start_response, '200 OK', 'Payment done')
+        # with vads_return_mode=GET, the fields are sent back to the shop
+        location = '%s%s%s' % (url, '&' if '?' in url else '?',
+                               urlencode(notification))
+        return self.respond(start_response, '302 Found',
+                            headers=[('Location', location)])
+
+    def respond(self, start_response, status, text='', headers=None):
+        start_response(status, [('Content-Type', 'text/plain')] +
+                       (headers or []))
+        return [text.encode('utf8')]
+
+    def notification(self, algorithm, data):
+        """
+        Signed notification of the payment form ``data``.
+        """
+        result = random.choices(self.result_codes, self.result_weights)[0]
+        notification = {f: data.get(f, '') for f in NOTIFIED_FIELDS}
+        notification.update({
+            'vads_auth_mode': 'FULL',
+            'vads_auth_number': '%06d' % random.randint(0, 999999),
+            'vads_auth_result': result,
+            'vads_card_brand': 'CB',
+            'vads_card_number': '497010XXXXXX0000',
+            'vads_effective_amount': data.get('vads_amount', ''),
+            'vads_extra_result': '',
+            'vads_operation_type': 'DEBIT',
+            'vads_result': result,
+            'vads_sequence_number': '1',
+            'vads_trans_status': TRANS_STATUS.get(result, 'REFUSED'),
+            'vads_url_check_src': 'PAY',
+        })
+        notification['signature'] = algorithm.sign(
+            signed_values(notification))
+        return notification
+
+    @property
+    def session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def notify(self, notification):
+        if self.latency:
+            time.sleep(self.latency)
+        self.send(notification)
+        if self.duplicates and random.random() < self.duplicates:
+            self.count('ipn_duplicates')
+            self.send(notification)
+
+    def send(self, notification):
+        """
+        Send the IPN until the shop acknowledges it, return whether it did.
+        """
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.count('ipn_retries')
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+            try:
+                response = self.session.post(self.ipn_url, data=notification,
+                                             timeout=30)
+            except requests.RequestException as e:
+                logger.warning("IPN of order %s not sent: %s",
+                               notification['vads_order_id'], e)
+                continue
+            if response.status_code == 200:
+                self.count('ipn_acknowledged')
+                return True
+            logger.warning("IPN of order %s answered %s: %s",
+                           notification['vads_order_id'],
+                           response.status_code, response.text[:200])
+        self.count('ipn_failed')
+        return False
+
+    def shutdown(self):
+        """
+        Wait for the pending IPNs.
+        """
+        self._executor.shutdown(wait=True)
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_simulator_server(simulator, host='127.0.0.1', port=8001):
+    return make_server(host, port, simulator,
+                       server_class=ThreadingWSGIServer,
+                       handler_class=QuietHandler)
@@ -0,0 +1,136 @@
+"""
+Buffered logging of the submitted transactions.
+
+The submit records are only kept for debugging purposes. With
+``SYSTEMPAY_SUBMIT_LOG = 'buffered'``, the redirect view does not insert
+them itself: they are handed to a process-wide buffer once the current
+database transaction commits, and the buffer saves them with a single
+``bulk_create`` as soon as ``SYSTEMPAY_SUBMIT_LOG_SIZE`` records are waiting,
+``SYSTEMPAY_SUBMIT_LOG_INTERVAL`` seconds after the first of them, or when
+the process exits.
+
+Records still buffered when the process is killed are lost, and the
+creation date of a buffered record is the date of its flush.
+"""
+import atexit
+import logging
+import threading
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections, transaction
+from django.dispatch import receiver
+
+from .models import SystemPayTransaction
+
+logger = logging.getLogger('systempay')
+
+SUBMIT_LOG_SYNC = 'sync'
+SUBMIT_LOG_BUFFERED = 'buffered'
+
+
+class SubmitLogBuffer(object):
+    """
+    Buffer of unsaved transactions, saved in bulk.
+    """
+
+    def __init__(self, size=100, interval=5.0, using='default'):
+        self.size = size
+        self.interval = interval
+        self.using = using
+        self._txns = []
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._txns)
+
+    def add(self, txn):
+        """
+        Buffer the transaction, flush the buffer once it is full.
+        """
+        with self._lock:
+            self._txns.append(txn)
+            full = len(self._txns) >= self.size
+            if not full and self._timer is None and self.interval:
+                self._timer = threading.Timer(self.interval,
+                                              self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Save the buffered transactions, return their number.
+        """
+        with self._lock:
+            txns, self._txns = self._txns, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if txns:
+            try:
+                SystemPayTransaction.objects.using(self.using).bulk_create(
+                    txns)
+            except Exception:
+                # debugging records must never break a checkout
+                logger.exception("Unable to save %d submitted transactions",
+                                 len(txns))
+                return 0
+        return len(txns)
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # the timer thread has its own connection
+            connections[self.using].close()
+
+
+_buffer = None
+
+
+def get_submit_log_buffer():
+    """
+    Return the buffer of the process, built from the settings.
+    """
+    global _buffer
+    if _buffer is None:
+        _buffer = SubmitLogBuffer(
+            size=getattr(settings, 'SYSTEMPAY_SUBMIT_LOG_SIZE', 100),
+            interval=getattr(settings, 'SYSTEMPAY_SUBMIT_LOG_INTERVAL', 5.0),
+            using=getattr(settings, 'SYSTEMPAY_SUBMIT_LOG_DATABASE',
+                          'default'),
+        )
+    return _buffer
+
+
+def log_submit_txn(txn):
+    """
+    Save the submitted transaction according to ``SYSTEMPAY_SUBMIT_LOG``.
+    """
+    mode = getattr(settings, 'SYSTEMPAY_SUBMIT_LOG', SUBMIT_LOG_SYNC)
+    if mode == SUBMIT_LOG_SYNC:
+        txn.save(force_insert=True)
+    elif mode == SUBMIT_LOG_BUFFERED:
+        submit_buffer = get_submit_log_buffer()
+        transaction.on_commit(lambda: submit_buffer.add(txn),
+                              using=submit_buffer.using)
+    else:
+        raise RuntimeError("Unknown SYSTEMPAY_SUBMIT_LOG mode: %s" % mode)
+    return txn
+
+
+@atexit.register
+def flush_submit_log():
+    if _buffer is not None:
+        _buffer.flush()
+
+
+@receiver(setting_changed)
+def reset_submit_log_buffer(setting, **kwargs):
+    global _buffer
+    if setting.startswith('SYSTEMPAY_SUBMIT_LOG') and _buffer is not None:
+        _buffer.flush()
+        _buffer = None
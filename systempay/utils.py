@@ -1,4 +1,12 @@
+import base64
+import datetime
+import json
+import zlib
 from decimal import Decimal as D
+from urllib.parse import parse_qs, urlencode
+
+from django.conf import settings
+from django.utils import timezone
 
 
 def set_amount_for_systempay(amount):
@@ -19,3 +27,78 @@ def get_amount_from_systempay(amount):
 def printable_form_errors(form):
     return ' / '.join([u"%s: %s" % (f.name, '. '.join(f.errors))
                        for f in form if f.errors])
+
+
+def parse_day(value):
+    """
+    Parse a ``YYYY-MM-DD`` day into the datetime of its beginning, in the
+    current timezone.
+    """
+    dt = datetime.datetime.strptime(value, '%Y-%m-%d')
+    if settings.USE_TZ:
+        dt = timezone.make_aware(dt, timezone.get_current_timezone())
+    return dt
+
+
+# Storage formats of ``SystemPayTransaction.raw_request``
+RAW_FORMAT_URLENCODE, RAW_FORMAT_JSON, RAW_FORMAT_ZLIB = (
+    'urlencode', 'json', 'zlib')
+RAW_FORMATS = (RAW_FORMAT_URLENCODE, RAW_FORMAT_JSON, RAW_FORMAT_ZLIB)
+ZLIB_PREFIX = 'zlib:'
+
+
+def get_raw_format(raw):
+    if raw.startswith(ZLIB_PREFIX):
+        return RAW_FORMAT_ZLIB
+    if raw.startswith('{'):
+        return RAW_FORMAT_JSON
+    return RAW_FORMAT_URLENCODE
+
+
+def encode_raw_request(data, format=None):
+    """
+    Serialize the dict ``data`` in the format ``SYSTEMPAY_RAW_REQUEST_FORMAT``
+    or ``format``.
+
+    The compact formats only store the values of the non-empty fields. The
+    names of the empty fields are stored under the ``""`` key, they are
+    still needed to check the signature of the notifications.
+    """
+    if format is None:
+        format = getattr(settings, 'SYSTEMPAY_RAW_REQUEST_FORMAT',
+                         RAW_FORMAT_URLENCODE)
+    if format == RAW_FORMAT_URLENCODE:
+        return urlencode(data)
+    if format not in RAW_FORMATS:
+        raise RuntimeError("Unknown SYSTEMPAY_RAW_REQUEST_FORMAT: %s"
+                           % format)
+
+    values = {k: str(v) for k, v in data.items()}
+    compact = {k: v for k, v in values.items() if v}
+    empty = sorted(k for k, v in values.items() if not v)
+    if empty:
+        compact[''] = empty
+    raw = json.dumps(compact, sort_keys=True, separators=(',', ':'))
+    if format == RAW_FORMAT_ZLIB:
+        raw = ZLIB_PREFIX + base64.b64encode(
+            zlib.compress(raw.encode('utf8'), 9)).decode('ascii')
+    return raw
+
+
+def decode_raw_request(raw):
+    """
+    Parse a ``raw_request`` of any format into a dict of lists, as
+    ``parse_qs`` does.
+    """
+    if not raw:
+        return {}
+    format = get_raw_format(raw)
+    if format == RAW_FORMAT_URLENCODE:
+        return parse_qs(raw, keep_blank_values=True)
+    if format == RAW_FORMAT_ZLIB:
+        raw = zlib.decompress(
+            base64.b64decode(raw[len(ZLIB_PREFIX):])).decode('utf8')
+    compact = json.loads(raw)
+    ctx = {k: [''] for k in compact.pop('', ())}
+    ctx.update((k, [v]) for k, v in compact.items())
+    return ctx
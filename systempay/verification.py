@@ -0,0 +1,124 @@
+"""
+Verification of the signature of stored transactions, for auditing.
+
+The signature is checked straight from ``raw_request``, without building
+any Django form, and large ranges of transactions are split in chunks
+verified by a pool of processes.
+"""
+import os
+from collections import deque
+from functools import lru_cache
+from multiprocessing import Pool
+
+from .export import iterate
+from .forms import SystemPaySubmitForm, sorted_vads_params
+from .models import SystemPayTransaction
+from .signature import get_signature_algorithm
+from .utils import decode_raw_request
+
+CHUNK_SIZE = 1000
+
+
+def signature_values(mode, ctx):
+    """
+    Sorted values of the signed fields of a transaction, from its parsed
+    ``raw_request``.
+    """
+    if mode == SystemPayTransaction.MODE_SUBMIT:
+        # every field of the submit form is signed, even the empty ones
+        params = SystemPaySubmitForm.signature_fields()
+    else:
+        params = sorted_vads_params(frozenset(ctx))
+    return tuple([ctx[p][0] if p in ctx else '' for p in params])
+
+
+def compute_signature(algorithm, mode, ctx):
+    return algorithm.sign(signature_values(mode, ctx))
+
+
+def verify(algorithm, mode, ctx):
+    """
+    Return a tuple ``(valid, expected signature, signature received)``.
+    """
+    expected = compute_signature(algorithm, mode, ctx)
+    received = ctx['signature'][0] if 'signature' in ctx else ''
+    return algorithm.compare(expected, received), expected, received
+
+
+@lru_cache()
+def _algorithm(name, certificate):
+    return get_signature_algorithm(name, certificate)
+
+
+def verify_rows(signature_settings, rows):
+    """
+    Verify ``(pk, mode, raw_request)`` rows, return the mismatches as
+    ``(pk, expected signature, signature received)``.
+
+    ``signature_settings`` gives the signature algorithm and certificate by
+    shop id (`None` for the default shop), see
+    `FacadeRegistry.signature_settings`.
+    """
+    mismatches = []
+    for pk, mode, raw_request in rows:
+        ctx = decode_raw_request(raw_request)
+        shop_id = ctx['vads_site_id'][0] if 'vads_site_id' in ctx else None
+        algorithm = _algorithm(*signature_settings.get(
+            shop_id, signature_settings[None]))
+        valid, expected, received = verify(algorithm, mode, ctx)
+        if not valid:
+            mismatches.append((pk, expected, received))
+    return mismatches
+
+
+def _verify_chunk(args):
+    return verify_rows(*args)
+
+
+def chunks(queryset, chunk_size):
+    rows = iterate(queryset.order_by('pk').values_list(
+        'pk', 'mode', 'raw_request'), chunk_size)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def verify_transactions(queryset, signature_settings, chunk_size=CHUNK_SIZE,
+                        processes=None):
+    """
+    Generate the mismatches of the transactions of ``queryset`` as
+    ``(pk, expected signature, signature received)``, see `verify_rows`.
+
+    Chunks are verified by a pool of ``processes`` processes (as many as
+    CPUs by default), or in the current process if ``processes`` is 1.
+
+    The chunks are read by the calling thread, within its database
+    transaction, and at most two chunks per process are in flight.
+    """
+    tasks = ((signature_settings, chunk)
+             for chunk in chunks(queryset, chunk_size))
+    if processes == 1:
+        for task in tasks:
+            for mismatch in _verify_chunk(task):
+                yield mismatch
+        return
+
+    processes = processes or os.cpu_count() or 1
+    pool = Pool(processes)
+    try:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(_verify_chunk, (task,)))
+            if len(pending) >= 2 * processes:
+                for mismatch in pending.popleft().get():
+                    yield mismatch
+        while pending:
+            for mismatch in pending.popleft().get():
+                yield mismatch
+    finally:
+        pool.terminate()
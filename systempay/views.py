@@ -6,6 +6,8 @@ from django.conf import settings
 from django.apps import apps
 from django.views import generic
 from django.contrib import messages
+from django.contrib.sites.shortcuts import get_current_site
+from django.db import IntegrityError, transaction
 from django.http import (HttpResponse, Http404, HttpResponseRedirect,
                          HttpResponseBadRequest)
 from django.core.urlresolvers import reverse
@@ -13,10 +15,12 @@ from django.utils.translation import ugettext_lazy as _
 
 from oscar.core.loading import get_class, get_classes
 
+from . import metrics
 from .models import SystemPayTransaction
-from .facade import Facade
+from .facade import get_facade, get_facade_for_notification
 from .gateway import Gateway
-from .exceptions import SystemPayError
+from .notifications import enqueue_notification
+from .exceptions import SystemPayError, SystemPayDuplicateNotification
 
 logger = logging.getLogger('systempay')
 
@@ -39,6 +43,26 @@ EventHandler = get_class('order.processing', 'EventHandler')
 CANCELLED = 'CANCELLED'
 
 
+_source_type_ids = {}
+
+
+def get_source_type_id():
+    """
+    Id of the `systempay` payment source type, fetched once per process.
+
+    The id is only kept once committed, a source type created by a
+    transaction which is then rolled back is created again by the next call.
+    """
+    try:
+        return _source_type_ids['systempay']
+    except KeyError:
+        pass
+    source_type, created = SourceType.objects.get_or_create(name='systempay')
+    transaction.on_commit(
+        lambda: _source_type_ids.setdefault('systempay', source_type.pk))
+    return source_type.pk
+
+
 class SecureRedirectView(CheckoutSessionMixin, generic.DetailView):
     """
     Simple Redirect Page initiating the transaction throughout
@@ -60,10 +84,13 @@ class SecureRedirectView(CheckoutSessionMixin, generic.DetailView):
         return order
 
     def get(self, *args, **kwargs):
+        with metrics.timer('systempay.view', view='secure_redirect'):
+            return self.redirect(*args, **kwargs)
 
+    def redirect(self, *args, **kwargs):
         order = self.get_object()
 
-        facade = Facade()
+        facade = get_facade(get_current_site(self.request))
         self._form = facade.set_submit_form(order)
         facade.save_submit_txn(order.number, order.total_incl_tax, self._form)
         response = super(SecureRedirectView, self).get(*args, **kwargs)
@@ -78,7 +105,8 @@ class SecureRedirectView(CheckoutSessionMixin, generic.DetailView):
     def get_context_data(self, **kwargs):
         ctx = super(SecureRedirectView, self).get_context_data(**kwargs)
         ctx['submit_form'] = self._form
-        ctx['SYSTEMPAY_GATEWAY_URL'] = Gateway.URL
+        ctx['SYSTEMPAY_GATEWAY_URL'] = getattr(
+            settings, 'SYSTEMPAY_GATEWAY_URL', Gateway.URL)
         return ctx
 
 
@@ -148,6 +176,10 @@ class ResponseView(generic.RedirectView):
 
 class ReturnResponseView(ResponseView):
     def get_redirect_url(self, **kwargs):
+        with metrics.timer('systempay.view', view='return'):
+            return self.return_url()
+
+    def return_url(self):
         order = self.get_order()
 
         # check if transaction exists
@@ -182,12 +214,17 @@ class ReturnResponseView(ResponseView):
 
 class CancelResponseView(ResponseView):
     def get_redirect_url(self, **kwargs):
+        with metrics.timer('systempay.view', view='cancel'):
+            return self.cancel_url()
+
+    def cancel_url(self):
         order = self.get_order()
 
         # cancel the order (to deallocate the products)
-        handler = EventHandler()
-        handler.handle_order_status_change(
-            order, getattr(settings, 'OSCAR_STATUS_CANCELLED', None))
+        with metrics.timer('systempay.cancel.order_status'):
+            handler = EventHandler()
+            handler.handle_order_status_change(
+                order, getattr(settings, 'OSCAR_STATUS_CANCELLED', None))
 
         # unfreeze the basket
         basket = Basket.objects.get(pk=order.basket_id)
@@ -215,40 +252,98 @@ class IpnView(OrderPlacementMixin, generic.View):
         return HttpResponse()
 
     def post(self, request, *args, **kwargs):
+        with metrics.timer('systempay.view', view='ipn'):
+            return self.receive_ipn(request)
+
+    def receive_ipn(self, request):
+        if getattr(settings, 'SYSTEMPAY_ASYNC_IPN', False):
+            return self.enqueue_ipn(request)
+
         try:
             self.handle_ipn(request)
         except PaymentError as inst:
-            return HttpResponseBadRequest(inst.message)
+            return HttpResponseBadRequest(str(inst))
 
         #todo: send message to customer
 
         return HttpResponse('ok')
 
+    def enqueue_ipn(self, request):
+        """
+        Acknowledge a signed notification right away and queue it, to be
+        handled by the `systempay_process_notifications` command.
+        """
+        facade = get_facade_for_notification(request.POST)
+        if not facade.is_signature_valid(request.POST):
+            logger.warning("IPN rejected, invalid signature: %s",
+                           request.POST.urlencode())
+            return HttpResponseBadRequest(_("Invalid signature"))
+
+        enqueue_notification(request.POST)
+        return HttpResponse('ok')
+
     def handle_ipn(self, request, **kwargs):
+        """
+        :param request: request from IpnView
+        :return: None
+        """
+        return self.handle_notification(request.POST)
+
+    def handle_notification(self, data):
         """
         Complete payment. Register:
             - transaction
             - source
             - payment event
-        :param request: request from IpnView
+
+        The transaction is saved first, in its own database transaction and
+        without its notification key, so that it is kept when the payment
+        can't be registered. The key, the source and the payment event are
+        then saved in a single database transaction, and the order is locked
+        until it is committed.
+
+        :param data: QueryDict of the notification
         :return: None
         """
 
-        # TODO: Avoid duplicate transaction / source / payment event
-
         try:
-            txn = Facade().set_txn(request)
+            txn = get_facade_for_notification(data).set_txn_from_data(
+                data, identify=False)
+            # outside of the order transaction, the id is cached once
+            # committed
+            source_type_id = get_source_type_id()
+            return self.register_payment(
+                txn, SystemPayTransaction.get_notification_key(data),
+                source_type_id)
+        except SystemPayDuplicateNotification as e:
+            # already handled, only acknowledge it again
+            logger.info("%s", e)
+            return
         except SystemPayError:
             return
 
-        try:
-            order = Order.objects.get(number=txn.order_number)
-        except Order.DoesNotExist:
-            msg = "Unable to retrieve Order #%s" % txn.order_number
-            logger.error(msg)
+    @transaction.atomic
+    def register_payment(self, txn, notification_key, source_type_id):
+        """
+        Register the source and the payment event of the notification
+        ``txn`` on its order.
 
-        source_type, _ = SourceType.objects.get_or_create(name='systempay')
-        trans_status = txn.value('vads_trans_status')
+        The notification key is set in the same database transaction: a
+        notification is only taken for a duplicate once its payment is
+        committed, whatever happens to the process before.
+
+        :return: SystemPayTransaction object
+        """
+        if notification_key:
+            txn.notification_key = notification_key
+            try:
+                with transaction.atomic():
+                    txn.save(update_fields=['notification_key'])
+            except IntegrityError:
+                # registered concurrently
+                raise SystemPayDuplicateNotification(notification_key)
+
+        trans_status = txn.trans_status
         payment_event = '%s-%s' % (txn.operation_type, trans_status)
 
         refunded = allocated = debited = D(0)
@@ -275,20 +370,29 @@ class IpnView(OrderPlacementMixin, generic.View):
                 _("Unknown operation type '%(operation_type)s'")
                 % {'operation_type': txn.operation_type})
 
-        source = Source(source_type=source_type,
-                        currency=txn.currency,
-                        amount_allocated=allocated,
-                        amount_debited=debited,
-                        amount_refunded=refunded,
-                        reference=txn.reference)
-
-        # Update order status to 'being processed'
-        handler = EventHandler()
-        handler.handle_order_status_change(order, getattr(settings, 'OSCAR_STATUS_BEING_PROCESSED', ''))
-
-        self.add_payment_source(source)
-        self.add_payment_event(payment_event,
-                               txn.amount, reference=txn.reference)
-        self.save_payment_details(order)
+        with metrics.timer('systempay.ipn.order_status'):
+            try:
+                order = Order.objects.select_for_update().get(
+                    number=txn.order_number)
+            except Order.DoesNotExist:
+                msg = "Unable to retrieve Order #%s" % txn.order_number
+                logger.error(msg)
+                raise PaymentError(msg)
+
+            source = Source(source_type_id=source_type_id,
+                            currency=txn.currency,
+                            amount_allocated=allocated,
+                            amount_debited=debited,
+                            amount_refunded=refunded,
+                            reference=txn.reference)
+
+            # Update order status to 'being processed'
+            handler = EventHandler()
+            handler.handle_order_status_change(order, getattr(settings, 'OSCAR_STATUS_BEING_PROCESSED', ''))
+
+            self.add_payment_source(source)
+            self.add_payment_event(payment_event,
+                                   txn.amount, reference=txn.reference)
+            self.save_payment_details(order)
 
         return txn
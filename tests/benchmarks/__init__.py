@@ -0,0 +1,94 @@
+"""
+Benchmarks of the SystemPay hot paths.
+
+Benchmark modules are not collected by the default test run. They are all
+run, and their results written as JSON, with::
+
+    ./runtests.py --benchmarks --rows 1000000 --output results.json
+
+or one by one, e.g.::
+
+    ./runtests.py --benchmarks tests.benchmarks.lookup_benchmarks
+
+The size of the seeded tables is read from the ``SYSTEMPAY_BENCH_ROWS``
+environment variable, set by ``--rows``.
+"""
+import datetime
+import os
+import time
+
+from django.db import connection
+from django.test import TestCase
+
+from systempay.models import SystemPayTransaction
+
+BENCH_ROWS = int(os.environ.get('SYSTEMPAY_BENCH_ROWS', 100000))
+
+# Every measure taken during the run, as dicts
+RESULTS = []
+
+
+def measure(func, number=1000):
+    """
+    Return the mean duration of a call to ``func`` in seconds.
+    """
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return (time.perf_counter() - start) / number
+
+
+def seed_transactions(count, start=0, batch_size=5000):
+    """
+    Insert ``count`` response transactions, numbered from ``start``.
+
+    Each order gets its own number and the ids follow the daily range
+    allowed by SystemPay.
+    """
+    origin = datetime.datetime(2017, 1, 1)
+    for offset in range(start, start + count, batch_size):
+        batch = []
+        for i in range(offset, min(offset + batch_size, start + count)):
+            trans_date = origin + datetime.timedelta(seconds=i)
+            batch.append(SystemPayTransaction(
+                mode=SystemPayTransaction.MODE_RESPONSE,
+                operation_type=SystemPayTransaction.OPERATION_TYPE_DEBIT,
+                trans_id='%06d' % (i % 900000),
+                trans_date=trans_date.strftime('%Y%m%d%H%M%S'),
+                order_number='%08d' % i,
+                amount=i % 1000,
+                result='00',
+                raw_request='vads_order_id=%08d' % i,
+            ))
+        SystemPayTransaction.objects.bulk_create(batch)
+
+
+def query_plan(queryset):
+    """
+    Return the SQLite query plan of ``queryset`` as a single string, or
+    ``None`` on other backends.
+    """
+    if connection.vendor != 'sqlite':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        return ' / '.join(str(row[-1]) for row in cursor.fetchall())
+
+
+class BenchmarkCase(TestCase):
+
+    def record(self, name, seconds, **extra):
+        result = {'benchmark': '%s.%s' % (self.__class__.__name__, name),
+                  'seconds': seconds}
+        result.update(extra)
+        RESULTS.append(result)
+        print('%-60s %12.3f us' % (result['benchmark'], seconds * 1e6))
+        return result
+
+    def assertUsesIndex(self, queryset):
+        plan = query_plan(queryset)
+        if plan is None:
+            return
+        self.assertTrue('SEARCH' in plan and 'USING' in plan,
+                        msg="Full table scan: %s" % plan)
@@ -0,0 +1,36 @@
+from systempay.dashboard.forms import TransactionSearchForm
+from systempay.models import SystemPayTransaction
+
+from tests.benchmarks import (BENCH_ROWS, BenchmarkCase, measure,
+                              seed_transactions)
+
+
+class TransactionSearchBenchmark(BenchmarkCase):
+    """
+    Every filter of the dashboard search must be served by an index.
+    """
+
+    SEARCHES = {
+        'order_number': {'order_number': '0000123'},
+        'trans_id': {'trans_id': '000123'},
+        'result': {'result': '05'},
+        'operation_type': {'operation_type': 'CREDIT'},
+        'trans_status': {'trans_status': 'CANCELLED'},
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_transactions(BENCH_ROWS)
+
+    def search(self, data):
+        form = TransactionSearchForm(data)
+        self.assertTrue(form.is_valid(), msg=form.errors)
+        qs = SystemPayTransaction.objects.order_by('-date_created', '-id')
+        return form.filter(qs)[:50]
+
+    def test_searches(self):
+        for name, data in sorted(self.SEARCHES.items()):
+            qs = self.search(data)
+            self.assertUsesIndex(qs)
+            self.record(name, measure(lambda: list(self.search(data)),
+                                      number=100), rows=BENCH_ROWS)
@@ -0,0 +1,120 @@
+from decimal import Decimal as D
+
+from django.contrib.auth import get_user_model
+from django.core.urlresolvers import reverse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from oscar.apps.order.models import Order
+from oscar.apps.payment.models import PaymentEventType
+from oscar.test.factories import create_order
+
+from systempay.facade import get_facade
+from systempay.forms import SystemPayNotificationForm
+
+from tests.benchmarks import (BENCH_ROWS, BenchmarkCase, measure,
+                              seed_transactions)
+from tests.unit.ipn_tests import NOTIFICATION
+
+# Notifications handled by the write benchmarks, each one is new
+WRITES = 200
+
+
+def notifications(gateway, count, **kwargs):
+    """
+    Signed notifications of distinct transactions, as dicts.
+    """
+    for i in range(count):
+        data = dict(NOTIFICATION, vads_trans_id='%06d' % i, **kwargs)
+        if 'vads_order_id' not in kwargs:
+            data['vads_order_id'] = '%06d' % i
+        data['signature'] = gateway.compute_signature(
+            SystemPayNotificationForm(data))
+        yield data
+
+
+class SubmitFormBenchmark(BenchmarkCase):
+    """
+    Building and signing of the payment form of the redirect page.
+    """
+
+    def test_set_submit_form(self):
+        order = Order(number='100313', total_incl_tax=D('15.24'))
+        facade = get_facade()
+        self.record('set_submit_form',
+                    measure(lambda: facade.set_submit_form(order)))
+
+
+class SetTxnBenchmark(BenchmarkCase):
+    """
+    Validation and recording of notifications by the facade.
+    """
+
+    def test_set_txn(self):
+        facade = get_facade()
+        factory = RequestFactory()
+        requests = iter([factory.post('/handle-ipn', data) for data in
+                         notifications(facade.gateway, WRITES)])
+        self.record('set_txn', measure(lambda: facade.set_txn(next(requests)),
+                                       number=WRITES))
+
+
+@override_settings(
+    OSCAR_STATUS_BEING_PROCESSED='Being processed',
+    OSCAR_ORDER_STATUS_PIPELINE={'Pending': ('Being processed',),
+                                 'Being processed': ()},
+    OSCAR_ORDER_STATUS_CASCADE={})
+class IpnViewBenchmark(BenchmarkCase):
+    """
+    Full IPN round trip through the test client: one order paid per
+    notification, then replays.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(WRITES):
+            create_order(number='%06d' % i, status='Pending')
+        PaymentEventType.objects.create(name='DEBIT-AUTHORISED')
+
+    def setUp(self):
+        self.url = reverse('systempay:handle-ipn')
+
+    def test_ipn_view(self):
+        data = list(notifications(get_facade().gateway, WRITES))
+        first = iter(data)
+        self.record('ipn', measure(
+            lambda: self.client.post(self.url, next(first)), number=WRITES))
+        self.assertEqual(Order.objects.filter(
+            status='Being processed').count(), WRITES)
+
+        replays = iter(data)
+        self.record('ipn_replay', measure(
+            lambda: self.client.post(self.url, next(replays)),
+            number=WRITES))
+
+
+class DashboardListBenchmark(BenchmarkCase):
+    """
+    Rendering of the first page of the dashboard list, on a table of
+    ``SYSTEMPAY_BENCH_ROWS`` rows (1M with ``./runtests.py --benchmarks
+    --rows 1000000``).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_transactions(BENCH_ROWS)
+        cls.staff = get_user_model().objects.create_user(
+            'staff', 'staff@example.com', 'password', is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def test_list_rendering(self):
+        url = reverse('systempay-list')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.record('list', measure(lambda: self.client.get(url), number=50),
+                    rows=BENCH_ROWS)
+        self.record('list_search', measure(
+            lambda: self.client.get(url, {'result': '05'}), number=50),
+            rows=BENCH_ROWS)
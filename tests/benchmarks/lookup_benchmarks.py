@@ -0,0 +1,51 @@
+from systempay.models import SystemPayTransaction
+
+from tests.benchmarks import (BENCH_ROWS, BenchmarkCase, measure,
+                              seed_transactions)
+
+
+class TransactionLookupBenchmark(BenchmarkCase):
+    """
+    The customer return page and the IPN reconciliation must not depend on
+    the size of the transaction table.
+    """
+
+    # Maximum slowdown tolerated when the table grows tenfold
+    MAX_RATIO = 3.0
+
+    def return_page_query(self, order_number):
+        return SystemPayTransaction.objects.filter(
+            mode=SystemPayTransaction.MODE_RESPONSE,
+            order_number=order_number
+        ).order_by('-date_created')[:1]
+
+    def ipn_query(self, trans_id, trans_date):
+        return SystemPayTransaction.objects.filter(
+            trans_id=trans_id, trans_date=trans_date)
+
+    def measure_lookups(self, size):
+        order_number = '%08d' % (size // 2)
+        txn = SystemPayTransaction.objects.get(order_number=order_number)
+        return (
+            measure(lambda: list(self.return_page_query(order_number))),
+            measure(lambda: list(self.ipn_query(txn.trans_id,
+                                                txn.trans_date))),
+        )
+
+    def test_lookups_stay_constant_time(self):
+        small = max(BENCH_ROWS // 10, 1)
+        seed_transactions(small)
+        return_small, ipn_small = self.measure_lookups(small)
+
+        seed_transactions(BENCH_ROWS - small, start=small)
+        return_large, ipn_large = self.measure_lookups(BENCH_ROWS)
+
+        self.assertUsesIndex(self.return_page_query('00000001'))
+        self.assertUsesIndex(self.ipn_query('000001', '20170101000001'))
+
+        self.record('return_page', return_large, rows=BENCH_ROWS,
+                    ratio=return_large / return_small)
+        self.record('ipn', ipn_large, rows=BENCH_ROWS,
+                    ratio=ipn_large / ipn_small)
+        self.assertLess(return_large / return_small, self.MAX_RATIO)
+        self.assertLess(ipn_large / ipn_small, self.MAX_RATIO)
@@ -0,0 +1,49 @@
+from urllib.parse import urlencode
+
+from systempay.models import SystemPayTransaction
+
+from tests.benchmarks import BenchmarkCase, measure
+
+
+def notification_raw_request(size=100):
+    params = {'vads_trans_status': 'AUTHORISED',
+              'vads_currency': '978',
+              'vads_amount': '1904',
+              'vads_order_id': '100368',
+              'vads_operation_type': 'DEBIT'}
+    for i in range(size - len(params)):
+        params['vads_extra_field_%02d' % i] = 'value %d' % i
+    return urlencode(params)
+
+
+class TransactionContextBenchmark(BenchmarkCase):
+    """
+    Accessors of a transaction built on a 100 fields notification.
+    """
+
+    def setUp(self):
+        self.raw_request = notification_raw_request()
+        self.txn = SystemPayTransaction(raw_request=self.raw_request,
+                                        currency='EUR',
+                                        trans_status='AUTHORISED')
+
+    def uncached(self, accessor):
+        def run():
+            accessor(SystemPayTransaction(raw_request=self.raw_request))
+        return run
+
+    def test_value(self):
+        self.record('value_first_access',
+                    measure(self.uncached(lambda t: t.value('vads_amount'))))
+        self.record('value', measure(lambda: self.txn.value('vads_amount')))
+
+    def test_columns(self):
+        self.record('currency', measure(lambda: self.txn.currency))
+        self.record('trans_status', measure(lambda: self.txn.trans_status))
+
+    def test_debug(self):
+        self.record('debug_first_access',
+                    measure(self.uncached(lambda t: t.debug())))
+        self.record('debug', measure(lambda: self.txn.debug()))
+        self.record('debug_verbose',
+                    measure(lambda: self.txn.debug(verbose=True)))
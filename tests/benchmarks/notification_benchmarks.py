@@ -0,0 +1,68 @@
+from django.http import QueryDict
+
+from systempay.facade import get_facade
+from systempay.forms import SystemPayNotificationForm
+
+from tests.benchmarks import BenchmarkCase, measure
+
+# Notification received from the SystemPay test platform
+RAW_NOTIFICATION = (
+    "vads_validation_mode=0&vads_cust_cell_phone=&vads_threeds_error_code=&"
+    "vads_auth_number=171970&vads_site_id=12345678&vads_cust_id=&"
+    "vads_ctx_mode=TEST&vads_language=fr&vads_payment_config=SINGLE&"
+    "vads_ship_to_name=&vads_threeds_cavv=Q2F2dkNhdnZDYXZ2Q2F2dkNhdnY%3D&"
+    "vads_extra_result=&vads_version=V2&vads_cust_country=&vads_cust_city=&"
+    "vads_auth_mode=FULL&vads_trans_id=550758&vads_contrib=&"
+    "vads_threeds_xid=dkNBQURpbHluUHMzbHdqSnRsSnc%3D&vads_card_country=FR&"
+    "vads_cust_phone=&vads_order_info=&vads_cust_address=&"
+    "vads_ship_to_phone_num=&vads_currency=978&vads_page_action=PAYMENT&"
+    "vads_cust_name=&vads_sequence_number=1&vads_order_info2=&"
+    "vads_order_info3=&"
+    "vads_payment_certificate=f59522596f05f1b18e878f586ea31b4809832969&"
+    "vads_threeds_enrolled=Y&vads_trans_date=20121122151746&"
+    "vads_url_check_src=PAY&vads_warranty_result=YES&vads_auth_result=00&"
+    "vads_payment_src=EC&vads_threeds_exit_status=10&vads_cust_zip=&"
+    "vads_card_brand=CB&vads_pays_ip=FR&vads_capture_delay=0&"
+    "vads_ship_to_street=&vads_ship_to_state=&vads_cust_email=&"
+    "vads_contract_used=5830136&vads_action_mode=INTERACTIVE&"
+    "vads_ship_to_street2=&vads_user_info=&vads_threeds_status=Y&"
+    "vads_amount=1904&vads_order_id=100368&vads_ship_to_zip=&"
+    "vads_ship_to_country=&vads_threeds_eci=05&vads_cust_state=&"
+    "vads_threeds_sign_valid=1&vads_expiry_year=2013&"
+    "vads_effective_amount=1904&vads_expiry_month=6&"
+    "vads_threeds_cavvAlgorithm=2&vads_result=00&vads_operation_type=DEBIT&"
+    "vads_cust_title=&vads_trans_status=AUTHORISED&vads_theme_config=&"
+    "vads_ship_to_city=&"
+    "vads_hash=rcI8uquHGoTJ69krXVkmBDSydSIoFJs2ZE8S26Xt4DQ-&"
+    "vads_card_number=497010XXXXXX0000")
+
+
+def signed_notification(gateway):
+    data = QueryDict(RAW_NOTIFICATION, mutable=True)
+    data['signature'] = gateway.compute_signature(
+        SystemPayNotificationForm(data))
+    return data
+
+
+class NotificationValidationBenchmark(BenchmarkCase):
+    """
+    Validation of a signed notification: Django form and fast path.
+    """
+
+    def setUp(self):
+        self.gateway = get_facade().gateway
+        self.data = signed_notification(self.gateway)
+
+    def form_validation(self):
+        form = SystemPayNotificationForm(self.data)
+        assert form.is_valid()
+        assert self.gateway.is_signature_valid(form)
+
+    def fast_path_validation(self):
+        parser = self.gateway.notification_parser
+        assert parser.check_signature(self.data)[0]
+        assert parser.clean(self.data)[1] is None
+
+    def test_validation(self):
+        self.record('form', measure(self.form_validation))
+        self.record('fast_path', measure(self.fast_path_validation))
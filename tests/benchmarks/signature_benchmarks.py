@@ -0,0 +1,70 @@
+from hashlib import sha1
+
+from django.utils.encoding import force_text
+
+from systempay.facade import get_facade
+from systempay.forms import SystemPayNotificationForm, SystemPaySubmitForm
+from systempay.signature import ALGORITHMS, get_signature_algorithm
+
+from tests.benchmarks import BenchmarkCase, measure
+from tests.unit.ipn_tests import NOTIFICATION
+
+
+def legacy_signature(form, certificate):
+    """
+    Signature as computed before the order of the fields was cached: they
+    were filtered and sorted on each call.
+    """
+    params = sorted(p for p in form.signature_params(form.data)
+                    if p.startswith('vads_'))
+    values = tuple([force_text(form.data.get(p, ''), encoding='utf8')
+                    for p in params])
+    sign = '+'.join(values) + '+' + certificate
+    return sha1(sign.encode(encoding='utf8')).hexdigest()
+
+
+class SignatureBenchmark(BenchmarkCase):
+    """
+    Signatures per second of the submit form and of a notification.
+    """
+
+    def setUp(self):
+        self.gateway = get_facade().gateway
+        submit_data = dict(NOTIFICATION)
+        submit_data.update({'vads_page_action': 'PAYMENT',
+                            'vads_payment_config': 'SINGLE'})
+        self.forms = {
+            'submit': SystemPaySubmitForm(submit_data),
+            'notification': SystemPayNotificationForm(dict(NOTIFICATION)),
+        }
+
+    def test_signatures_per_second(self):
+        certificate = self.gateway._certificate
+        for name, form in sorted(self.forms.items()):
+            self.assertEqual(legacy_signature(form, certificate),
+                             self.gateway.compute_signature(form))
+            before = measure(lambda: legacy_signature(form, certificate))
+            after = measure(lambda: self.gateway.compute_signature(form))
+            self.record('%s_before' % name, before,
+                        signatures_per_second=1 / before)
+            self.record('%s_after' % name, after,
+                        signatures_per_second=1 / after)
+
+
+class SignatureAlgorithmBenchmark(BenchmarkCase):
+    """
+    Throughput of the signature algorithms on a notification.
+    """
+
+    def test_algorithms(self):
+        form = SystemPayNotificationForm(dict(NOTIFICATION))
+        values = form.values_for_signature(form.data)
+        for name in sorted(ALGORITHMS):
+            algorithm = get_signature_algorithm(name, '1122334455667788')
+            signature = algorithm.sign(values)
+            sign = measure(lambda: algorithm.sign(values))
+            verify = measure(lambda: algorithm.verify(values, signature))
+            self.record('%s_sign' % name, sign,
+                        signatures_per_second=1 / sign)
+            self.record('%s_verify' % name, verify,
+                        signatures_per_second=1 / verify)
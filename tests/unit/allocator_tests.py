@@ -0,0 +1,98 @@
+import datetime
+
+from django.core.cache import caches
+from django.db import transaction
+from django.test import SimpleTestCase, TransactionTestCase
+
+from systempay import allocators
+from systempay.allocators import (CacheTransIdAllocator,
+                                  ClockTransIdAllocator,
+                                  DatabaseTransIdAllocator)
+from systempay.exceptions import SystemPayError
+
+NOW = datetime.datetime(2017, 1, 13, 23, 59, 59, 999999)
+
+
+class TestClockAllocator(SimpleTestCase):
+
+    def test_ids_stay_in_the_allowed_range(self):
+        allocator = ClockTransIdAllocator()
+        self.assertEqual(allocator.allocate('12345678', NOW), 863999)
+        self.assertEqual(allocator.allocate(
+            '12345678', datetime.datetime(2017, 1, 13)), 0)
+
+
+class TestDatabaseAllocator(TransactionTestCase):
+    # reservations are committed on their own, the allocator is tested in
+    # autocommit mode
+
+    def test_ids_are_unique_across_processes(self):
+        # one allocator per process
+        first = DatabaseTransIdAllocator(block_size=10)
+        second = DatabaseTransIdAllocator(block_size=10)
+        ids = [first.allocate('12345678', NOW) for i in range(15)] + \
+            [second.allocate('12345678', NOW) for i in range(15)] + \
+            [first.allocate('12345678', NOW) for i in range(15)]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(max(ids), 49)
+
+    def test_ids_are_daily_and_per_site(self):
+        allocator = DatabaseTransIdAllocator(block_size=10)
+        allocator.allocate('12345678', NOW)
+        tomorrow = NOW + datetime.timedelta(days=1)
+        self.assertEqual(allocator.allocate('12345678', tomorrow), 0)
+        self.assertEqual(allocator.allocate('87654321', tomorrow), 0)
+
+    def test_range_is_exhausted(self):
+        allocator = DatabaseTransIdAllocator(block_size=10)
+        max_trans_id, allocators.MAX_TRANS_ID = allocators.MAX_TRANS_ID, 15
+        try:
+            ids = [allocator.allocate('12345678', NOW) for i in range(15)]
+            self.assertEqual(ids, list(range(15)))
+            with self.assertRaises(SystemPayError):
+                allocator.allocate('12345678', NOW)
+        finally:
+            allocators.MAX_TRANS_ID = max_trans_id
+
+    def test_reservation_is_refused_in_a_transaction(self):
+        allocator = DatabaseTransIdAllocator(block_size=10)
+        with transaction.atomic():
+            with self.assertRaises(RuntimeError):
+                allocator.allocate('12345678', NOW)
+        # the ids are not given twice after a rollback
+        self.assertEqual(allocator.allocate('12345678', NOW), 0)
+        with transaction.atomic():
+            self.assertEqual(allocator.allocate('12345678', NOW), 1)
+
+
+class TestCacheAllocator(SimpleTestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def test_ids_are_unique_across_processes(self):
+        first = CacheTransIdAllocator(block_size=10)
+        second = CacheTransIdAllocator(block_size=10)
+        ids = [first.allocate('12345678', NOW) for i in range(15)] + \
+            [second.allocate('12345678', NOW) for i in range(15)] + \
+            [first.allocate('12345678', NOW) for i in range(15)]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(max(ids), 49)
+
+    def test_ids_are_daily_and_per_site(self):
+        allocator = CacheTransIdAllocator(block_size=10)
+        allocator.allocate('12345678', NOW)
+        tomorrow = NOW + datetime.timedelta(days=1)
+        self.assertEqual(allocator.allocate('12345678', tomorrow), 0)
+        self.assertEqual(allocator.allocate('87654321', tomorrow), 0)
+
+    def test_range_is_exhausted(self):
+        allocator = CacheTransIdAllocator(block_size=10)
+        max_trans_id, allocators.MAX_TRANS_ID = allocators.MAX_TRANS_ID, 15
+        try:
+            ids = [allocator.allocate('12345678', NOW) for i in range(15)]
+            self.assertEqual(ids, list(range(15)))
+            with self.assertRaises(SystemPayError):
+                allocator.allocate('12345678', NOW)
+        finally:
+            allocators.MAX_TRANS_ID = max_trans_id
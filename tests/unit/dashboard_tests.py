@@ -0,0 +1,83 @@
+import datetime
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.utils import timezone
+
+from systempay.dashboard.views import KeysetPage, TransactionListView
+from systempay.models import SystemPayTransaction
+
+
+@patch.object(TransactionListView, 'paginate_by', 2)
+class TestKeysetPagination(TestCase):
+
+    def setUp(self):
+        staff = get_user_model().objects.create_user(
+            'staff', 'staff@example.com', 'password', is_staff=True)
+        self.client.force_login(staff)
+
+        # newest first: 5, 4, 3, 2, 1, the ids 1 and 2, and 3 and 4 share
+        # their date
+        now = timezone.now()
+        self.pks = []
+        for i, hours in enumerate((3, 3, 2, 2, 1)):
+            txn = SystemPayTransaction.objects.create(
+                mode=SystemPayTransaction.MODE_RESPONSE,
+                order_number='10036%d' % (i % 2), amount=i,
+                raw_request='vads_order_id=10036%d' % (i % 2))
+            SystemPayTransaction.objects.filter(pk=txn.pk).update(
+                date_created=now - datetime.timedelta(hours=hours))
+            self.pks.append(txn.pk)
+        self.pks.reverse()
+
+    def get(self, **params):
+        return self.client.get(reverse('systempay-list'), params)
+
+    def page(self, **params):
+        response = self.get(**params)
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        return ([txn.pk for txn in page.object_list],
+                page.has_previous(), page.has_next())
+
+    def cursor(self, pk):
+        return KeysetPage.encode_cursor(
+            SystemPayTransaction.objects.get(pk=pk))
+
+    def test_first_page(self):
+        self.assertEqual(self.page(), (self.pks[:2], False, True))
+
+    def test_after(self):
+        # the next page starts with the row sharing the date of the cursor
+        self.assertEqual(self.page(after=self.cursor(self.pks[1])),
+                         (self.pks[2:4], True, True))
+
+    def test_last_page(self):
+        self.assertEqual(self.page(after=self.cursor(self.pks[3])),
+                         (self.pks[4:], True, False))
+
+    def test_before(self):
+        self.assertEqual(self.page(before=self.cursor(self.pks[4])),
+                         (self.pks[2:4], True, True))
+        self.assertEqual(self.page(before=self.cursor(self.pks[2])),
+                         (self.pks[:2], False, True))
+
+    def test_invalid_cursor(self):
+        for cursor in ('garbage', '2017-01-13T10:00:00,x', 'not-a-date,12'):
+            self.assertEqual(self.get(after=cursor).status_code, 404)
+            self.assertEqual(self.get(before=cursor).status_code, 404)
+
+    def test_search_params_are_kept(self):
+        response = self.get(order_number='100360')
+        self.assertEqual(response.context['search_params'],
+                         'order_number=100360')
+        pks = [txn.pk for txn in response.context['page_obj'].object_list]
+        self.assertEqual(pks, [self.pks[0], self.pks[2]])
+
+        response = self.get(order_number='100360',
+                            after=self.cursor(self.pks[2]))
+        self.assertEqual(response.context['search_params'],
+                         'order_number=100360')
+        self.assertContains(response, '?order_number=100360&amp;before=')
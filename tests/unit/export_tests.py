@@ -0,0 +1,124 @@
+import csv
+import datetime
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+from systempay import export
+from systempay.models import SystemPayTransaction
+from systempay.utils import parse_day
+
+
+class ExportTestCase(TestCase):
+
+    def setUp(self):
+        # one transaction of each mode on 2017-01-01, 2017-01-02, 2017-01-03
+        day = parse_day('2017-01-01')
+        for i in range(3):
+            for mode in (SystemPayTransaction.MODE_SUBMIT,
+                         SystemPayTransaction.MODE_RESPONSE):
+                txn = SystemPayTransaction.objects.create(
+                    mode=mode, order_number='10036%d' % i, amount=i,
+                    trans_id='55075%d' % i,
+                    raw_request='vads_order_id=10036%d' % i)
+                SystemPayTransaction.objects.filter(pk=txn.pk).update(
+                    date_created=day + datetime.timedelta(days=i, hours=1))
+
+    def order_numbers(self, rows, mode=SystemPayTransaction.MODE_RESPONSE):
+        return [row['order_number'] for row in rows if row['mode'] == mode]
+
+
+class TestExportLines(ExportTestCase):
+
+    def test_csv_header_and_rows(self):
+        lines = list(export.export_lines(
+            SystemPayTransaction.objects.all(), 'csv', chunk_size=2))
+        self.assertEqual(len(lines), 7)
+        reader = csv.reader(io.StringIO(''.join(lines)))
+        self.assertEqual(tuple(next(reader)), export.EXPORT_FIELDS)
+
+        rows = [dict(zip(export.EXPORT_FIELDS, row)) for row in reader]
+        self.assertEqual(self.order_numbers(rows),
+                         ['100360', '100361', '100362'])
+        self.assertEqual(rows[0]['trans_id'], '550750')
+
+    def test_one_ndjson_line_per_row(self):
+        lines = list(export.export_lines(
+            SystemPayTransaction.objects.all(), 'ndjson', chunk_size=2))
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(all(line.endswith('\n') for line in lines))
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(set(rows[0]), set(export.EXPORT_FIELDS))
+        self.assertEqual(self.order_numbers(rows),
+                         ['100360', '100361', '100362'])
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            export.export_lines(SystemPayTransaction.objects.all(), 'xml')
+
+
+class TestExportView(ExportTestCase):
+
+    def setUp(self):
+        super(TestExportView, self).setUp()
+        staff = get_user_model().objects.create_user(
+            'staff', 'staff@example.com', 'password', is_staff=True)
+        self.client.force_login(staff)
+
+    def export(self, **params):
+        response = self.client.get(reverse('systempay-export'), params)
+        if response.status_code != 200:
+            return response, None
+        content = b''.join(response.streaming_content).decode('utf8')
+        return response, content
+
+    def test_csv(self):
+        response, content = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('systempay-transactions.csv',
+                      response['Content-Disposition'])
+        self.assertEqual(len(content.splitlines()), 7)
+
+    def test_search_filters_are_exported(self):
+        response, content = self.export(format='ndjson',
+                                        order_number='100361',
+                                        date_from='2017-01-02')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['order_number'] for row in rows],
+                         ['100361', '100361'])
+
+    def test_unknown_format(self):
+        response, content = self.export(format='xml')
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_filter_exports_nothing(self):
+        response, content = self.export(format='csv', order_number='100361',
+                                        date_from='not-a-date')
+        self.assertIsNone(content)
+        self.assertRedirects(
+            response, '%s?order_number=100361&date_from=not-a-date'
+            % reverse('systempay-list'), fetch_redirect_response=False)
+
+
+class TestExportCommand(ExportTestCase):
+
+    def test_period_and_mode(self):
+        out = io.StringIO()
+        call_command('systempay_export', '--format', 'ndjson',
+                     '--since', '2017-01-02', '--until', '2017-01-03',
+                     '--mode', SystemPayTransaction.MODE_SUBMIT, stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([(row['order_number'], row['mode']) for row in rows],
+                         [('100361', SystemPayTransaction.MODE_SUBMIT)])
+
+    def test_csv_since(self):
+        out = io.StringIO()
+        call_command('systempay_export', '--since', '2017-01-03', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], ','.join(export.EXPORT_FIELDS))
+        self.assertEqual(len(lines), 3)
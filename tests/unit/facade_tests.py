@@ -0,0 +1,54 @@
+from decimal import Decimal as D
+
+from django.contrib.sites.models import Site
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+from oscar.apps.order.models import Order
+
+from systempay.facade import (get_facade, get_facade_for_notification,
+                              get_registry)
+
+
+class TestSharedFacade(SimpleTestCase):
+
+    def test_facade_is_built_once(self):
+        self.assertIs(get_facade(), get_facade())
+
+    def test_facade_follows_settings(self):
+        facade = get_facade()
+        with override_settings(SYSTEMPAY_SITE_ID='87654321'):
+            self.assertIsNot(get_facade(), facade)
+            self.assertEqual(get_facade().gateway._site_id, '87654321')
+        self.assertNotEqual(get_facade().gateway._site_id, '87654321')
+
+
+@override_settings(SYSTEMPAY_MERCHANTS={
+    2: {'SITE_ID': '87654321', 'CERTIFICATE': '8877665544332211',
+        'CURRENCY': '756'},
+})
+class TestFacadeRegistry(SimpleTestCase):
+
+    def test_facade_by_site(self):
+        self.assertEqual(get_facade(Site(pk=2)).gateway.site_id, '87654321')
+        self.assertIs(get_facade(Site(pk=3)), get_facade())
+        self.assertIs(get_facade(Site(pk=2)), get_facade(Site(pk=2)))
+
+    def test_facade_by_notification(self):
+        facade = get_facade_for_notification({'vads_site_id': '87654321'})
+        self.assertIs(facade, get_facade(Site(pk=2)))
+        self.assertIs(get_facade_for_notification({}), get_facade())
+
+    def test_signature_settings(self):
+        signature_settings = get_registry().signature_settings()
+        self.assertEqual(signature_settings['87654321'],
+                         ('SHA1', '8877665544332211'))
+        self.assertEqual(signature_settings[None],
+                         get_facade().gateway.signature_settings())
+
+    def test_currency_by_site(self):
+        order = Order(number='100368', total_incl_tax=D('19.04'))
+        form = get_facade(Site(pk=2)).set_submit_form(order)
+        self.assertEqual(form.data['vads_currency'], '756')
+        form = get_facade().set_submit_form(order)
+        self.assertEqual(form.data['vads_currency'], '978')
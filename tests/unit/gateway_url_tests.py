@@ -0,0 +1,35 @@
+from django.contrib.sites.models import Site
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from systempay.gateway import get_return_urls
+
+
+class TestReturnUrls(TestCase):
+
+    def setUp(self):
+        self.site = Site.objects.get_current()
+        self.site.domain = 'shop.example.com'
+        self.site.save()
+
+    def test_urls_are_cached(self):
+        return_url, cancel_url = get_return_urls()
+        self.assertTrue(return_url.startswith('https://shop.example.com/'))
+        self.assertTrue(cancel_url.startswith('https://shop.example.com/'))
+        with self.assertNumQueries(0):
+            self.assertEqual(get_return_urls(), (return_url, cancel_url))
+
+    def test_cache_is_cleared_when_the_site_is_saved(self):
+        get_return_urls()
+        self.site.domain = 'www.example.com'
+        self.site.save()
+        self.assertTrue(
+            get_return_urls()[0].startswith('https://www.example.com/'))
+
+    @override_settings(SYSTEMPAY_RETURN_URL='https://example.com/return',
+                       SYSTEMPAY_CANCEL_URL='https://example.com/cancel')
+    def test_urls_from_settings(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(get_return_urls(),
+                             ('https://example.com/return',
+                              'https://example.com/cancel'))
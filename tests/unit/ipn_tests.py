@@ -0,0 +1,199 @@
+from unittest.mock import patch
+
+from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+
+from oscar.apps.payment.models import PaymentEventType
+from oscar.test.factories import create_order
+
+from systempay.exceptions import (SystemPayDuplicateNotification,
+                                  SystemPayFormNotValid)
+from systempay.facade import Facade
+from systempay.forms import SystemPayNotificationForm
+from systempay.metrics import get_metrics
+from systempay.models import SystemPayNotification, SystemPayTransaction
+from systempay.notifications import process_notifications
+from systempay.views import EventHandler, IpnView, get_source_type_id
+
+NOTIFICATION = {
+    'vads_action_mode': 'INTERACTIVE',
+    'vads_amount': '1904',
+    'vads_auth_mode': 'FULL',
+    'vads_auth_number': '171970',
+    'vads_auth_result': '00',
+    'vads_card_brand': 'CB',
+    'vads_ctx_mode': 'TEST',
+    'vads_currency': '978',
+    'vads_effective_amount': '1904',
+    'vads_operation_type': 'DEBIT',
+    'vads_order_id': '100368',
+    'vads_result': '00',
+    'vads_sequence_number': '1',
+    'vads_site_id': '12345678',
+    'vads_trans_date': '20121122151746',
+    'vads_trans_id': '550758',
+    'vads_trans_status': 'AUTHORISED',
+    'vads_version': 'V2',
+}
+
+
+class WorkerInterrupted(BaseException):
+    pass
+
+
+class IpnTestCase(TestCase):
+
+    def setUp(self):
+        self.facade = Facade()
+        self.factory = RequestFactory()
+
+    def sign(self, data):
+        form = SystemPayNotificationForm(data)
+        data['signature'] = self.facade.gateway.compute_signature(form)
+        return data
+
+    def notification_data(self, **kwargs):
+        data = dict(NOTIFICATION)
+        data.update(kwargs)
+        return self.sign(data)
+
+    def notification_request(self, **kwargs):
+        return self.factory.post('/handle-ipn',
+                                 self.notification_data(**kwargs))
+
+
+class TestDuplicateNotification(IpnTestCase):
+
+    def test_replay_is_not_saved(self):
+        txn = self.facade.set_txn(self.notification_request())
+        self.assertEqual(txn.notification_key,
+                         '12345678-20121122-550758-1')
+        with self.assertRaises(SystemPayDuplicateNotification):
+            self.facade.set_txn(self.notification_request())
+        self.assertEqual(SystemPayTransaction.objects.count(), 1)
+
+    def test_next_sequence_is_not_a_replay(self):
+        self.facade.set_txn(self.notification_request())
+        self.facade.set_txn(
+            self.notification_request(vads_sequence_number='2'))
+        self.assertEqual(SystemPayTransaction.objects.count(), 2)
+
+    def test_invalid_notification_does_not_block_the_valid_one(self):
+        data = self.notification_data()
+        data['signature'] = '0' * 40
+        with self.assertRaises(SystemPayFormNotValid):
+            self.facade.set_txn(self.factory.post('/handle-ipn', data))
+
+        txn = self.facade.set_txn(self.notification_request())
+        self.assertIsNotNone(txn.notification_key)
+
+
+@override_settings(
+    OSCAR_STATUS_BEING_PROCESSED='Being processed',
+    OSCAR_ORDER_STATUS_PIPELINE={'Pending': ('Being processed',),
+                                 'Being processed': ()},
+    OSCAR_ORDER_STATUS_CASCADE={})
+class TestIpnView(IpnTestCase):
+
+    def setUp(self):
+        super(TestIpnView, self).setUp()
+        self.order = create_order(number='100368', status='Pending')
+        get_source_type_id()
+        PaymentEventType.objects.create(name='DEBIT-AUTHORISED')
+
+    def post(self, request):
+        return IpnView.as_view()(request)
+
+    def test_payment_is_registered(self):
+        response = self.post(self.notification_request())
+        self.assertEqual(response.content, b'ok')
+
+        order = self.order.__class__.objects.get(pk=self.order.pk)
+        self.assertEqual(order.status, 'Being processed')
+        source = order.sources.get()
+        self.assertEqual(source.source_type_id, get_source_type_id())
+        self.assertEqual(source.amount_debited,
+                         SystemPayTransaction.objects.get().amount)
+        self.assertEqual(order.payment_events.count(), 1)
+
+    def test_replay_is_only_acknowledged(self):
+        self.post(self.notification_request())
+        response = self.post(self.notification_request())
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(self.order.sources.count(), 1)
+        self.assertEqual(self.order.payment_events.count(), 1)
+
+    def test_unknown_order_keeps_transaction(self):
+        request = self.notification_request(vads_order_id='100369')
+        self.assertEqual(self.post(request).status_code, 400)
+        txn = SystemPayTransaction.objects.get()
+        self.assertEqual(txn.order_number, '100369')
+        # the notification resent by SystemPay is handled again
+        self.assertIsNone(txn.notification_key)
+        self.assertEqual(self.post(request).status_code, 400)
+        self.assertEqual(SystemPayTransaction.objects.count(), 2)
+
+    def test_interrupted_payment_is_registered_on_replay(self):
+        request = self.notification_request()
+        # e.g. the SystemExit of a worker timeout
+        with patch.object(EventHandler, 'handle_order_status_change',
+                          side_effect=WorkerInterrupted):
+            with self.assertRaises(WorkerInterrupted):
+                self.post(request)
+        self.assertIsNone(SystemPayTransaction.objects.get().notification_key)
+        self.assertEqual(self.order.sources.count(), 0)
+
+        response = self.post(self.notification_request())
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(self.order.sources.count(), 1)
+        self.assertEqual(self.order.payment_events.count(), 1)
+        self.assertEqual(SystemPayTransaction.objects.exclude(
+            notification_key=None).count(), 1)
+
+    def test_number_of_queries(self):
+        # duplicate lookup, savepoint, transaction insert, release, source
+        # type lookup (only cached once committed), savepoint, savepoint,
+        # notification key update, release, order lock, order status change
+        # and order update, payment event type, source insert, payment event
+        # insert, order lines, line quantity insert, release
+        request = self.notification_request()
+        with self.assertNumQueries(18):
+            self.post(request)
+
+        # a replay costs the duplicate lookup only
+        with self.assertNumQueries(1):
+            self.post(request)
+
+    @override_settings(SYSTEMPAY_METRICS_BACKEND='systempay.metrics.'
+                                                 'MemoryMetrics')
+    def test_metrics(self):
+        request = self.notification_request()
+        self.post(request)
+        collector = get_metrics()
+        for name in ('systempay.view', 'systempay.ipn.verify',
+                     'systempay.ipn.db_write', 'systempay.ipn.order_status'):
+            self.assertEqual(collector.timed(name), 1, msg=name)
+        self.assertEqual(collector.counts[
+            'systempay.ipn.result',
+            (('result', '00'), ('trans_status', 'AUTHORISED'))], 1)
+
+    @override_settings(SYSTEMPAY_ASYNC_IPN=True)
+    def test_asynchronous_ipn(self):
+        response = self.post(self.notification_request())
+        self.assertEqual(response.content, b'ok')
+        self.assertEqual(SystemPayTransaction.objects.count(), 0)
+
+        self.assertEqual(process_notifications(), 1)
+        notification = SystemPayNotification.objects.get()
+        self.assertEqual(notification.status,
+                         SystemPayNotification.STATUS_PROCESSED)
+        self.assertEqual(self.order.sources.count(), 1)
+        self.assertEqual(process_notifications(), 0)
+
+    @override_settings(SYSTEMPAY_ASYNC_IPN=True)
+    def test_asynchronous_ipn_checks_signature(self):
+        data = self.notification_data()
+        data['signature'] = '0' * 40
+        response = self.post(self.factory.post('/handle-ipn', data))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(SystemPayNotification.objects.exists())
@@ -0,0 +1,123 @@
+from decimal import Decimal as D
+from importlib import import_module
+from unittest.mock import patch
+from urllib.parse import urlencode
+
+from django.apps import apps
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import override_settings
+
+from systempay.facade import Facade
+from systempay.models import SystemPayTransaction
+from systempay.utils import (decode_raw_request, encode_raw_request,
+                             get_raw_format)
+
+from tests.unit.ipn_tests import NOTIFICATION
+
+backfill_migration = import_module(
+    'systempay.migrations.0004_backfill_transaction_columns')
+
+
+class TestTransactionContext(SimpleTestCase):
+
+    def setUp(self):
+        self.txn = SystemPayTransaction(
+            raw_request='vads_amount=1904&vads_order_id=100368&vads_hash=')
+
+    def test_context_is_parsed_once(self):
+        self.assertIs(self.txn.context, self.txn.context)
+        self.assertEqual(self.txn.value('vads_amount'), '1904')
+        self.assertEqual(self.txn.value('vads_hash'), '')
+        self.assertIsNone(self.txn.value('vads_currency'))
+
+    def test_context_follows_raw_request(self):
+        self.txn.context
+        self.txn.raw_request = 'vads_amount=2000'
+        self.assertEqual(self.txn.value('vads_amount'), '2000')
+        self.assertIsNone(self.txn.value('vads_order_id'))
+
+    def test_debug(self):
+        self.assertEqual(self.txn.debug(),
+                         ['amount=1904', 'order_id=100368'])
+        self.assertEqual(len(self.txn.debug(verbose=True)), 3)
+
+
+class TestCompactRawRequest(SimpleTestCase):
+
+    def setUp(self):
+        self.data = {'vads_amount': '1904', 'vads_order_id': '100368',
+                     'vads_hash': '', 'signature': 'abc=/+'}
+
+    def test_formats_decode_alike(self):
+        expected = decode_raw_request(encode_raw_request(self.data,
+                                                         'urlencode'))
+        for format in ('json', 'zlib'):
+            raw = encode_raw_request(self.data, format)
+            self.assertEqual(get_raw_format(raw), format)
+            self.assertEqual(decode_raw_request(raw), expected)
+            txn = SystemPayTransaction(raw_request=raw)
+            self.assertEqual(txn.value('vads_hash'), '')
+            self.assertEqual(txn.value('signature'), 'abc=/+')
+
+    def test_empty_values_are_not_stored(self):
+        raw = encode_raw_request(self.data, 'json')
+        self.assertNotIn('"vads_hash":', raw)
+
+    @override_settings(SYSTEMPAY_RAW_REQUEST_FORMAT='json')
+    def test_format_setting(self):
+        self.assertEqual(get_raw_format(encode_raw_request(self.data)),
+                         'json')
+
+
+class TestTransactionColumns(TestCase):
+
+    def setUp(self):
+        self.data = dict(NOTIFICATION, vads_effective_amount='1700',
+                         vads_extra_result='01')
+
+    def assertColumns(self, txn):
+        self.assertEqual(txn.currency, 'EUR')
+        self.assertEqual(txn.trans_status, 'AUTHORISED')
+        self.assertEqual(txn.card_brand, 'CB')
+        self.assertEqual(txn.effective_amount, D('17.00'))
+        self.assertEqual(txn.extra_result, '01')
+
+    def test_build_txn(self):
+        txn = Facade().build_txn('100368', D('19.04'), self.data,
+                                 SystemPayTransaction.MODE_RESPONSE)
+        self.assertIsNone(txn.pk)
+        self.assertColumns(txn)
+
+    def test_save_txn(self):
+        txn = Facade().save_txn('100368', D('19.04'), self.data,
+                                SystemPayTransaction.MODE_RESPONSE)
+        self.assertColumns(SystemPayTransaction.objects.get(pk=txn.pk))
+
+    def test_missing_values(self):
+        txn = Facade().build_txn('100368', D('19.04'),
+                                 {'vads_currency': '999'},
+                                 SystemPayTransaction.MODE_SUBMIT)
+        self.assertEqual(txn.currency, 'UNKNOWN')
+        self.assertIsNone(txn.effective_amount)
+        self.assertIsNone(txn.trans_status)
+
+    def test_backfill_migration(self):
+        for i in range(3):
+            SystemPayTransaction.objects.create(
+                mode=SystemPayTransaction.MODE_RESPONSE,
+                order_number='100368', amount=D('19.04'),
+                raw_request=urlencode(self.data))
+        SystemPayTransaction.objects.create(
+            mode=SystemPayTransaction.MODE_SUBMIT, order_number='100369',
+            amount=D('19.04'), raw_request='')
+
+        # the chunks are committed through savepoints of the test
+        with patch.object(backfill_migration, 'CHUNK_SIZE', 2):
+            backfill_migration.backfill_columns(apps, None)
+
+        for txn in SystemPayTransaction.objects.filter(
+                order_number='100368'):
+            self.assertColumns(txn)
+        empty = SystemPayTransaction.objects.get(order_number='100369')
+        self.assertEqual(empty.currency, 'UNKNOWN')
+        self.assertIsNone(empty.effective_amount)
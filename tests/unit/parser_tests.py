@@ -0,0 +1,51 @@
+from django.test import SimpleTestCase
+
+from systempay.facade import get_facade
+from systempay.forms import SystemPayNotificationForm
+from systempay.utils import printable_form_errors
+
+from tests.unit.ipn_tests import NOTIFICATION
+
+
+class TestNotificationParser(SimpleTestCase):
+
+    def setUp(self):
+        self.gateway = get_facade().gateway
+        self.parser = self.gateway.notification_parser
+
+    def sign(self, data):
+        data['signature'] = self.gateway.compute_signature(
+            SystemPayNotificationForm(data))
+        return data
+
+    def test_signature(self):
+        data = self.sign(dict(NOTIFICATION))
+        valid, expected, received = self.parser.check_signature(data)
+        self.assertTrue(valid)
+        self.assertEqual(expected, received)
+
+        data['vads_amount'] = '1'
+        valid, expected, received = self.parser.check_signature(data)
+        self.assertFalse(valid)
+        self.assertNotEqual(expected, received)
+
+    def test_cleaned_data(self):
+        notification, errors = self.parser.clean(
+            self.sign(dict(NOTIFICATION)))
+        self.assertIsNone(errors)
+        self.assertEqual(notification.vads_amount, '1904')
+        self.assertEqual(notification.get('vads_hash'), '')
+
+    def test_errors_match_the_form(self):
+        data = dict(NOTIFICATION, vads_auth_mode='PARTIAL',
+                    vads_trans_id='1234567')
+        del data['vads_currency']
+        data = self.sign(data)
+
+        form = SystemPayNotificationForm(data)
+        self.assertFalse(form.is_valid())
+        errors = self.parser.clean(data)[1]
+        self.assertEqual(
+            [e.split(':')[0] for e in errors.split(' / ')],
+            [e.split(':')[0]
+             for e in printable_form_errors(form).split(' / ')])
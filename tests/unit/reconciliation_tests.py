@@ -0,0 +1,74 @@
+import datetime
+from decimal import Decimal as D
+
+from django.test.utils import override_settings
+
+from oscar.apps.payment.models import PaymentEventType
+from oscar.test.factories import create_order
+
+from systempay import reconciliation
+from systempay.models import SystemPayTransaction
+from systempay.views import IpnView
+
+from tests.unit.ipn_tests import IpnTestCase
+
+
+@override_settings(
+    OSCAR_STATUS_BEING_PROCESSED='Being processed',
+    OSCAR_ORDER_STATUS_PIPELINE={'Pending': ('Being processed',),
+                                 'Being processed': ()},
+    OSCAR_ORDER_STATUS_CASCADE={})
+class TestReconciliation(IpnTestCase):
+
+    def setUp(self):
+        super(TestReconciliation, self).setUp()
+        self.order = create_order(number='100368', status='Pending')
+        self.order.__class__.objects.filter(pk=self.order.pk).update(
+            total_incl_tax=D('19.04'))
+        PaymentEventType.objects.create(name='DEBIT-AUTHORISED')
+        IpnView.as_view()(self.notification_request())
+
+    def kinds(self, since=None, until=None):
+        return [(i.order_number, i.kind)
+                for i in reconciliation.reconcile(since, until)]
+
+    def test_paid_order(self):
+        with self.assertNumQueries(4):
+            self.assertEqual(self.kinds(), [])
+
+    def test_missing_source(self):
+        self.order.sources.all().delete()
+        self.assertEqual(self.kinds(),
+                         [('100368', reconciliation.MISSING_SOURCE)])
+
+    def test_duplicate_source(self):
+        source = self.order.sources.get()
+        source.pk = None
+        source.save()
+        self.assertEqual(self.kinds(), [
+            ('100368', reconciliation.DUPLICATE_SOURCE),
+            ('100368', reconciliation.AMOUNT_MISMATCH),
+        ])
+
+    def test_missing_order(self):
+        # the transaction of an IPN of an unknown order is kept by the view
+        response = IpnView.as_view()(self.notification_request(
+            vads_order_id='100369', vads_trans_id='550759'))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.kinds(),
+                         [('100369', reconciliation.MISSING_ORDER)])
+
+    def test_refund_on_a_later_day(self):
+        PaymentEventType.objects.create(name='CREDIT-AUTHORISED')
+        IpnView.as_view()(self.notification_request(
+            vads_operation_type='CREDIT', vads_trans_id='550759'))
+        debit = SystemPayTransaction.objects.get(operation_type='DEBIT')
+        refund = SystemPayTransaction.objects.get(operation_type='CREDIT')
+        refund.date_created = debit.date_created + datetime.timedelta(days=1)
+        refund.save()
+
+        day = datetime.timedelta(days=1)
+        self.assertEqual(self.kinds(debit.date_created,
+                                    debit.date_created + day), [])
+        self.assertEqual(self.kinds(refund.date_created,
+                                    refund.date_created + day), [])
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase
+
+from systempay.models import SystemPayReportImport, SystemPayTransaction
+from systempay.reports import ReportImporter
+
+REPORT = """TRANSACTION_ID;TRANSACTION_DATE;STATUS;CAPTURE_DATE
+550758;2012-11-22 15:17:46;CAPTURED;2012-11-23 00:05:00
+550759;2012-11-22 16:00:00;CAPTURED;2012-11-23 00:05:00
+550758;2012-11-23 10:00:00;CAPTURED;2012-11-24 00:05:00
+"""
+
+
+class TestReportImport(TestCase):
+
+    def setUp(self):
+        for trans_id, trans_date in (('550758', '20121122151746'),
+                                     ('550759', '20121122160000'),
+                                     ('550758', '20121124100000')):
+            SystemPayTransaction.objects.create(
+                mode=SystemPayTransaction.MODE_RESPONSE, trans_id=trans_id,
+                trans_date=trans_date, raw_request='')
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+        self.path = os.path.join(self.tmp, 'report.csv')
+        with open(self.path, 'w') as f:
+            f.write(REPORT)
+
+    def test_import(self):
+        progress = ReportImporter(batch_size=2).import_file(self.path)
+        self.assertTrue(progress.is_complete)
+        self.assertEqual((progress.lines_done, progress.matched,
+                          progress.unmatched), (3, 2, 1))
+        captured = SystemPayTransaction.objects.filter(
+            capture_status='CAPTURED')
+        self.assertEqual(sorted(captured.values_list('trans_date',
+                                                     flat=True)),
+                         ['20121122151746', '20121122160000'])
+        # same id, another day
+        self.assertIsNone(SystemPayTransaction.objects.get(
+            trans_date='20121124100000').capture_status)
+
+    def test_resume(self):
+        SystemPayReportImport.objects.create(
+            file_name='report.csv', file_size=os.path.getsize(self.path),
+            lines_done=1, matched=1)
+        progress = ReportImporter().import_file(self.path)
+        self.assertEqual((progress.lines_done, progress.matched,
+                          progress.unmatched), (3, 2, 1))
+        # the first line was imported by the interrupted run
+        self.assertIsNone(SystemPayTransaction.objects.get(
+            trans_date='20121122151746').capture_status)
+
+    def test_complete_import_is_skipped(self):
+        ReportImporter().import_file(self.path)
+        with self.assertNumQueries(1):
+            ReportImporter().import_file(self.path)
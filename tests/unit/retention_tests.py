@@ -0,0 +1,52 @@
+import datetime
+import io
+import json
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from systempay.models import SystemPayTransaction
+from systempay.retention import months_ago, purge_transactions
+
+
+class TestMonthsAgo(SimpleTestCase):
+
+    def test_months_ago(self):
+        self.assertEqual(months_ago(datetime.datetime(2017, 3, 31), 1),
+                         datetime.datetime(2017, 2, 28))
+        self.assertEqual(months_ago(datetime.datetime(2017, 1, 15), 13),
+                         datetime.datetime(2015, 12, 15))
+
+
+class TestPurgeTransactions(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        for i in range(5):
+            for mode in (SystemPayTransaction.MODE_SUBMIT,
+                         SystemPayTransaction.MODE_RESPONSE):
+                SystemPayTransaction.objects.create(
+                    mode=mode, order_number='%06d' % i, amount=i,
+                    raw_request='vads_order_id=%06d' % i)
+        # three old transactions of each mode
+        SystemPayTransaction.objects.filter(
+            order_number__lt='000003').update(
+            date_created=self.now - datetime.timedelta(days=100))
+
+    def test_purge_by_chunks(self):
+        count = purge_transactions(SystemPayTransaction.MODE_SUBMIT,
+                                   self.now, chunk_size=2)
+        self.assertEqual(count, 3)
+        self.assertEqual(SystemPayTransaction.objects.filter(
+            mode=SystemPayTransaction.MODE_SUBMIT).count(), 2)
+        self.assertEqual(SystemPayTransaction.objects.filter(
+            mode=SystemPayTransaction.MODE_RESPONSE).count(), 5)
+
+    def test_archive(self):
+        archive = io.StringIO()
+        purge_transactions(SystemPayTransaction.MODE_RESPONSE, self.now,
+                           archive=archive)
+        rows = [json.loads(line) for line in archive.getvalue().splitlines()]
+        self.assertEqual([r['order_number'] for r in rows],
+                         ['000000', '000001', '000002'])
+        self.assertEqual(rows[0]['raw_request'], 'vads_order_id=000000')
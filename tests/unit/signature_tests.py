@@ -0,0 +1,42 @@
+import base64
+import hashlib
+import hmac
+
+from django.test import SimpleTestCase
+
+from systempay.signature import (HmacSha256Signature, Sha1Signature,
+                                 get_signature_algorithm)
+
+CERTIFICATE = '1122334455667788'
+VALUES = ('INTERACTIVE', '1904', '978', 'TEST', '12345678')
+SIGNED = b'INTERACTIVE+1904+978+TEST+12345678+1122334455667788'
+
+
+class TestSignatureAlgorithms(SimpleTestCase):
+
+    def test_sha1(self):
+        algorithm = get_signature_algorithm('SHA1', CERTIFICATE)
+        self.assertIsInstance(algorithm, Sha1Signature)
+        self.assertEqual(algorithm.sign(VALUES),
+                         hashlib.sha1(SIGNED).hexdigest())
+
+    def test_hmac_sha256(self):
+        algorithm = get_signature_algorithm('HMAC-SHA-256', CERTIFICATE)
+        self.assertIsInstance(algorithm, HmacSha256Signature)
+        expected = base64.b64encode(hmac.new(
+            CERTIFICATE.encode('utf8'), SIGNED, hashlib.sha256).digest())
+        self.assertEqual(algorithm.sign(VALUES), expected.decode('ascii'))
+        # the keyed state is not altered by a signature
+        self.assertEqual(algorithm.sign(VALUES), algorithm.sign(VALUES))
+
+    def test_verify(self):
+        for name in ('SHA1', 'HMAC-SHA-256'):
+            algorithm = get_signature_algorithm(name, CERTIFICATE)
+            self.assertTrue(algorithm.verify(VALUES, algorithm.sign(VALUES)))
+            self.assertFalse(algorithm.verify(VALUES, '0' * 40))
+            self.assertFalse(algorithm.verify(VALUES, None))
+            self.assertFalse(algorithm.verify(VALUES, '\xe9' * 40))
+
+    def test_unknown_algorithm(self):
+        with self.assertRaises(RuntimeError):
+            get_signature_algorithm('MD5', CERTIFICATE)
@@ -0,0 +1,78 @@
+import io
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from oscar.test.factories import create_order
+
+from systempay.facade import get_facade, get_registry
+from systempay.management.commands.systempay_load_test import (
+    checkout_session, parse_submit_form)
+from systempay.simulator import Simulator
+
+
+class TestSimulator(TestCase):
+
+    def setUp(self):
+        self.facade = get_facade()
+        self.simulator = Simulator(get_registry().signature_settings(),
+                                   'http://testserver/handle-ipn',
+                                   results={'05': 1})
+        self.sent = []
+        self.simulator.notify = self.sent.append
+
+    def submit_data(self):
+        form = self.facade.gateway.get_submit_form(19.04,
+                                                   vads_order_id='100368')
+        self.facade.gateway.sign(form)
+        return {name: form.data.get(name, '') for name in form.fields}
+
+    def post(self, data):
+        body = urlencode(data).encode('utf8')
+        environ = {'REQUEST_METHOD': 'POST',
+                   'CONTENT_LENGTH': str(len(body)),
+                   'wsgi.input': io.BytesIO(body)}
+        statuses = []
+        self.simulator(environ, lambda status, headers: statuses.append(
+            (status, dict(headers))))
+        self.simulator.shutdown()
+        return statuses[0]
+
+    def test_signed_payment_is_notified(self):
+        status, headers = self.post(self.submit_data())
+        self.assertEqual(status, '302 Found')
+        self.assertIn('vads_order_id=100368', headers['Location'])
+
+        notification, = self.sent
+        self.assertEqual(notification['vads_result'], '05')
+        self.assertEqual(notification['vads_trans_status'], 'REFUSED')
+        self.assertTrue(self.facade.is_signature_valid(notification))
+        parser = self.facade.gateway.notification_parser
+        self.assertIsNone(parser.clean(notification)[1])
+
+    def test_invalid_signature(self):
+        data = self.submit_data()
+        data['vads_amount'] = '1'
+        status, headers = self.post(data)
+        self.assertEqual(status, '400 Bad Request')
+        self.assertEqual(self.sent, [])
+        self.assertEqual(self.simulator.stats['invalid_signature'], 1)
+
+    @override_settings(
+        SYSTEMPAY_GATEWAY_URL='http://127.0.0.1:8001/vads-payment/')
+    def test_checkout_through_redirect_page(self):
+        order = create_order(number='100368', status='Pending')
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = \
+            checkout_session(order.pk)
+        page = self.client.get(reverse('systempay:secure-redirect'))
+        action, data = parse_submit_form(page.content.decode('utf8'))
+        self.assertEqual(action, 'http://127.0.0.1:8001/vads-payment/')
+        self.assertEqual(data['vads_order_id'], '100368')
+
+        status, headers = self.post(data)
+        self.assertEqual(status, '302 Found')
+        notification, = self.sent
+        self.assertTrue(self.facade.is_signature_valid(notification))
@@ -0,0 +1,79 @@
+from django.test import TransactionTestCase
+from django.test.utils import override_settings
+
+from systempay.facade import Facade
+from systempay.models import SystemPayTransaction
+from systempay.submitlog import SubmitLogBuffer, get_submit_log_buffer
+
+SUBMIT_DATA = {
+    'vads_amount': '1904',
+    'vads_currency': '978',
+    'vads_order_id': '100368',
+    'vads_trans_date': '20121122151746',
+    'vads_trans_id': '550758',
+}
+
+
+class FakeForm(object):
+    data = SUBMIT_DATA
+
+
+class TestSubmitLogBuffer(TransactionTestCase):
+    # buffered records are handed over on commit, the buffer is tested in
+    # autocommit mode
+
+    def build_txn(self, order_number):
+        return Facade().build_txn(order_number, 19.04, SUBMIT_DATA,
+                                  SystemPayTransaction.MODE_SUBMIT)
+
+    def test_flush_at_size_threshold(self):
+        submit_buffer = SubmitLogBuffer(size=3, interval=None)
+        for i in range(2):
+            submit_buffer.add(self.build_txn('%06d' % i))
+        self.assertEqual(SystemPayTransaction.objects.count(), 0)
+        with self.assertNumQueries(1):
+            submit_buffer.add(self.build_txn('000002'))
+        self.assertEqual(SystemPayTransaction.objects.count(), 3)
+        self.assertEqual(len(submit_buffer), 0)
+
+    def test_explicit_flush(self):
+        submit_buffer = SubmitLogBuffer(size=10, interval=None)
+        submit_buffer.add(self.build_txn('000001'))
+        self.assertEqual(submit_buffer.flush(), 1)
+        self.assertEqual(submit_buffer.flush(), 0)
+        self.assertEqual(SystemPayTransaction.objects.get().currency, 'EUR')
+
+    def test_flush_from_timer(self):
+        submit_buffer = SubmitLogBuffer(size=10, interval=0.05)
+        submit_buffer.add(self.build_txn('000001'))
+        timer = submit_buffer._timer
+        self.assertIsNotNone(timer)
+        # the next records wait for the same timer
+        submit_buffer.add(self.build_txn('000002'))
+        self.assertIs(submit_buffer._timer, timer)
+
+        timer.join(5)
+        self.assertFalse(timer.is_alive())
+        self.assertIsNone(submit_buffer._timer)
+        self.assertEqual(len(submit_buffer), 0)
+        self.assertEqual(SystemPayTransaction.objects.count(), 2)
+
+    def test_synchronous_by_default(self):
+        txn = Facade().save_submit_txn('100368', 19.04, FakeForm())
+        self.assertIsNotNone(txn.pk)
+
+    @override_settings(SYSTEMPAY_SUBMIT_LOG='buffered',
+                       SYSTEMPAY_SUBMIT_LOG_INTERVAL=None)
+    def test_buffered_submit(self):
+        with self.assertNumQueries(0):
+            txn = Facade().save_submit_txn('100368', 19.04, FakeForm())
+        self.assertIsNone(txn.pk)
+        self.assertEqual(len(get_submit_log_buffer()), 1)
+        get_submit_log_buffer().flush()
+        self.assertEqual(SystemPayTransaction.objects.filter(
+            mode=SystemPayTransaction.MODE_SUBMIT).count(), 1)
+
+    @override_settings(SYSTEMPAY_SUBMIT_LOG='unknown')
+    def test_unknown_mode(self):
+        with self.assertRaises(RuntimeError):
+            Facade().save_submit_txn('100368', 19.04, FakeForm())
@@ -0,0 +1,52 @@
+from systempay.facade import get_registry
+from systempay.models import SystemPayTransaction
+from systempay.verification import verify_transactions
+
+from tests.unit.ipn_tests import IpnTestCase
+
+
+class TestSignatureVerification(IpnTestCase):
+
+    def verify(self, **kwargs):
+        kwargs.setdefault('processes', 1)
+        return list(verify_transactions(
+            SystemPayTransaction.objects.all(),
+            get_registry().signature_settings(), **kwargs))
+
+    def test_computed_signature(self):
+        txn = self.facade.set_txn(self.notification_request())
+        self.assertEqual(txn.computed_signature, txn.value('signature'))
+
+    def test_mismatches_are_reported(self):
+        valid = self.facade.set_txn(self.notification_request())
+        tampered = self.facade.set_txn(
+            self.notification_request(vads_trans_id='550759'))
+        tampered.raw_request = tampered.raw_request.replace(
+            'vads_amount=1904', 'vads_amount=1')
+        tampered.save()
+
+        mismatches = self.verify()
+        self.assertEqual([m[0] for m in mismatches], [tampered.pk])
+        self.assertNotEqual(valid.pk, tampered.pk)
+
+    def test_submitted_transaction(self):
+        form = self.facade.gateway.get_submit_form(
+            19.04, vads_order_id='100368')
+        self.facade.gateway.sign(form)
+        self.facade.save_submit_txn('100368', 19.04, form)
+        self.assertEqual(self.verify(), [])
+
+    def test_pool_of_processes(self):
+        # the rows of the test transaction are read by the calling thread
+        tampered = []
+        for i in range(5):
+            txn = self.facade.set_txn(
+                self.notification_request(vads_trans_id='55076%d' % i))
+            if i % 2:
+                txn.raw_request = txn.raw_request.replace(
+                    'vads_amount=1904', 'vads_amount=1')
+                txn.save()
+                tampered.append(txn.pk)
+
+        mismatches = self.verify(processes=2, chunk_size=1)
+        self.assertEqual([m[0] for m in mismatches], tampered)
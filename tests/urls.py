@@ -1,9 +1,11 @@
-from django.conf.urls.defaults import *
+from django.conf.urls import include, url
 
-from oscar.app import shop
-from systempay.app import application as app
+from oscar.app import application as shop
+from systempay.app import application as systempay_app
+from systempay.dashboard.app import application as systempay_dashboard
 
-urlpatterns = patterns('',
-    (r'^checkout/systempay/', include(app.urls)),
-    (r'', include(shop.urls)),
-)
\ No newline at end of file
+urlpatterns = [
+    url(r'^checkout/systempay/', include(systempay_app.urls)),
+    url(r'^dashboard/systempay/', include(systempay_dashboard.urls)),
+    url(r'', include(shop.urls)),
+]